@@ -7,6 +7,8 @@ get_item_details, which is a whitelisted method called both client-side as well
 server-side (in validation functions) for several doctypes. Because of the dual nature,
 two methods were needed to ensure the correct code runs in all scenarios: the standard
 override whitelisted method in hooks.py and the monkey patch below.
+get_items_details and Purchase Order validation check many rows in one batch and set
+frappe.flags.item_details_validated, so the per-row check is skipped for those rows.
 
 The modification only applies when the Enable Work Order Subcontracting feature is selected in
 Inventory Tools Settings. If the feature is turned off, the default ERPNext behavior runs.
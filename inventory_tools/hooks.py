@@ -137,8 +137,85 @@ doc_events = {
 			"inventory_tools.inventory_tools.doctype.inventory_tools_settings.inventory_tools_settings.create_inventory_tools_settings",
 		],
 	},
+	"BOM": {
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.flat_bom_explosion.flat_bom_explosion.sync_flat_bom_explosion",
+			"inventory_tools.inventory_tools.overrides.bom.clear_bom_explosion_cache",
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.flat_bom_explosion.flat_bom_explosion.sync_flat_bom_explosion",
+			"inventory_tools.inventory_tools.overrides.bom.clear_bom_explosion_cache",
+		],
+		"on_update_after_submit": [
+			"inventory_tools.inventory_tools.overrides.bom.clear_bom_explosion_cache"
+		],
+	},
+	"BOM Update Log": {
+		"on_change": [
+			"inventory_tools.inventory_tools.doctype.flat_bom_explosion.flat_bom_explosion.sync_replaced_bom",
+			"inventory_tools.inventory_tools.overrides.bom.clear_bom_explosion_cache",
+		],
+	},
 	"Item": {
 		"validate": ["inventory_tools.inventory_tools.overrides.uom.duplicate_weight_to_uom_conversion"],
+		"on_update": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+	},
+	"Material Request": {
+		"on_update": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_update_after_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"after_delete": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+	},
+	"Purchase Order": {
+		"on_update": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"after_delete": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+	},
+	"Purchase Receipt": {
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+	},
+	"Stock Entry": {
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+	},
+	"Work Order": {
+		"on_submit": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
+		"on_cancel": [
+			"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.sync_open_material_demand"
+		],
 	},
 	"Warehouse": {
 		"validate": ["inventory_tools.inventory_tools.overrides.warehouse.update_warehouse_path"]
@@ -153,6 +230,12 @@ doc_events = {
 # Scheduled Tasks
 # ---------------
 
+scheduler_events = {
+	"daily_long": [
+		"inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand.rebuild_open_material_demand"
+	],
+}
+
 # scheduler_events = {
 # 	"all": [
 # 		"inventory_tools.tasks.all"
@@ -1,8 +1,9 @@
 import frappe
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 def boot_session(bootinfo):
 	bootinfo.inventory_tools_settings = {}
 	for company in frappe.get_all("Inventory Tools Settings", pluck="company"):
-		settings = frappe.get_doc("Inventory Tools Settings", company)
-		bootinfo.inventory_tools_settings[company] = settings
+		bootinfo.inventory_tools_settings[company] = get_inventory_tools_settings(company)
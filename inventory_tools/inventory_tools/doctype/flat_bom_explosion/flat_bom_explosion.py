@@ -0,0 +1,167 @@
+# Copyright (c) 2026, AgriTheory and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Min, Sum
+from frappe.utils import now
+
+from inventory_tools.inventory_tools.overrides.bom import (
+	BOM_EXPLOSION_CACHE_KEY,
+	explode_boms,
+	flatten_bom,
+)
+
+
+class FlatBOMExplosion(Document):
+	pass
+
+
+EXPLOSION_FIELDS = [
+	"root_bom",
+	"root_item",
+	"parent_bom",
+	"path",
+	"component",
+	"component_bom",
+	"description",
+	"stock_qty",
+	"qty_per_parent_bom",
+	"parent_bom_qty",
+	"qty_ratio",
+	"stock_uom",
+	"depth",
+]
+
+
+def sync_flat_bom_explosion(doc, method=None):
+	"""
+	doc_events hook for BOM submit and cancel: explodes a submitted BOM into the Flat BOM
+	Explosion table and removes a cancelled one. A submitted BOM is immutable and sub-assembly
+	BOMs must be submitted before they can be used, so no other BOM's rows change.
+	"""
+	delete_flat_bom_explosion([doc.name])
+	if doc.docstatus == 1:
+		insert_flat_bom_explosion([doc.name])
+
+
+def sync_replaced_bom(doc, method=None):
+	"""
+	doc_events hook for BOM Update Log: once the BOM Update Tool has replaced a sub-assembly BOM,
+	re-explodes every submitted BOM whose tree contained it. The replacement updates BOM Items
+	directly, so the BOM hooks don't run.
+	"""
+	if doc.update_type != "Replace BOM" or doc.status != "Completed" or not doc.current_bom:
+		return
+
+	boms = frappe.get_all(
+		"Flat BOM Explosion", {"component_bom": doc.current_bom}, pluck="root_bom", distinct=True
+	)
+	delete_flat_bom_explosion(boms)
+	insert_flat_bom_explosion(boms)
+
+
+@frappe.whitelist()
+def rebuild_flat_bom_explosion():
+	"""
+	Rebuilds the whole Flat BOM Explosion table from submitted BOMs; used on install and on demand
+	"""
+	if frappe.session.user != "Administrator":
+		frappe.only_for("System Manager")
+
+	FlatBOMExplosion = DocType("Flat BOM Explosion")
+	frappe.qb.from_(FlatBOMExplosion).delete().run()
+	insert_flat_bom_explosion(frappe.get_all("BOM", {"docstatus": 1}, pluck="name"))
+	frappe.cache().delete_key(BOM_EXPLOSION_CACHE_KEY)
+
+
+def delete_flat_bom_explosion(boms):
+	FlatBOMExplosion = DocType("Flat BOM Explosion")
+	frappe.qb.from_(FlatBOMExplosion).delete().where(FlatBOMExplosion.root_bom.isin(boms)).run()
+
+
+def insert_flat_bom_explosion(boms):
+	"""
+	Explodes the given BOMs level by level and bulk inserts one row per component occurrence, in
+	depth-first order (idx)
+
+	:param boms: list of BOM names
+	:return: None
+	"""
+	if not boms:
+		return
+
+	bom_items = dict(frappe.get_all("BOM", {"name": ["in", boms]}, ["name", "item"], as_list=1))
+	bom_children = explode_boms(boms)
+	timestamp = now()
+	user = frappe.session.user
+	fields = ["name", "creation", "modified", "owner", "modified_by", "idx", *EXPLOSION_FIELDS]
+	values = []
+	for bom_no in boms:
+		for idx, row in enumerate(flatten_bom(bom_no, bom_children), 1):
+			row.update(
+				{
+					"root_bom": bom_no,
+					"root_item": bom_items.get(bom_no),
+					"component": row.item,
+					"component_bom": row.bom,
+					"stock_uom": row.bom_uom,
+					"parent_bom_qty": row.bom_quantity,
+					"depth": row.indent,
+				}
+			)
+			values.append(
+				(
+					frappe.generate_hash(length=10),
+					timestamp,
+					timestamp,
+					user,
+					user,
+					idx,
+					*(row.get(fieldname) for fieldname in EXPLOSION_FIELDS),
+				)
+			)
+	if values:
+		frappe.db.bulk_insert("Flat BOM Explosion", fields, values)
+
+
+@frappe.whitelist()
+def get_where_used(item_code, top_level_only=True):
+	"""
+	Finds the BOMs that use an item anywhere in their tree, with the cumulative stock qty needed
+	per unit of each BOM, from indexed lookups on the Flat BOM Explosion table
+
+	:param item_code: str; component Item
+	:param top_level_only: bool; only return BOMs that are not themselves a sub-assembly of another
+	submitted BOM (finished goods)
+	:return: list of dicts with root_bom, root_item, stock_qty (summed over every occurrence of the
+	item in the tree), stock_uom and the minimum depth
+	"""
+	if not frappe.has_permission("Flat BOM Explosion", "read"):
+		frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
+
+	FlatBOMExplosion = DocType("Flat BOM Explosion")
+	SubAssembly = DocType("Flat BOM Explosion").as_("sub_assembly")
+	query = (
+		frappe.qb.from_(FlatBOMExplosion)
+		.select(
+			FlatBOMExplosion.root_bom,
+			FlatBOMExplosion.root_item,
+			Sum(FlatBOMExplosion.stock_qty).as_("stock_qty"),
+			FlatBOMExplosion.stock_uom,
+			Min(FlatBOMExplosion.depth).as_("depth"),
+		)
+		.where(FlatBOMExplosion.component == item_code)
+		.groupby(FlatBOMExplosion.root_bom, FlatBOMExplosion.root_item, FlatBOMExplosion.stock_uom)
+		.orderby(FlatBOMExplosion.root_bom)
+	)
+	if frappe.parse_json(top_level_only):
+		query = query.where(
+			FlatBOMExplosion.root_bom.notin(
+				frappe.qb.from_(SubAssembly)
+				.select(SubAssembly.component_bom)
+				.where(SubAssembly.component_bom.isnotnull())
+			)
+		)
+	return query.run(as_dict=True)
@@ -4,12 +4,20 @@
 import frappe
 from frappe.model.document import Document
 
+from inventory_tools.inventory_tools.settings import clear_inventory_tools_settings_cache
+
 
 class InventoryToolsSettings(Document):
 	def validate(self):
 		self.create_warehouse_path_custom_field()
 		self.validate_single_aggregation_company()
 
+	def on_update(self):
+		clear_inventory_tools_settings_cache(self.name)
+
+	def on_trash(self):
+		clear_inventory_tools_settings_cache(self.name)
+
 	def create_warehouse_path_custom_field(self):
 		if frappe.db.exists("Custom Field", "Warehouse-warehouse_path"):
 			if not self.update_warehouse_path:
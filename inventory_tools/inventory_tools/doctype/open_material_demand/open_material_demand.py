@@ -0,0 +1,193 @@
+# Copyright (c) 2026, AgriTheory and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+from frappe.query_builder import DocType
+from frappe.query_builder.functions import Coalesce, Sum
+from frappe.utils import now
+
+
+class OpenMaterialDemand(Document):
+	pass
+
+
+LEDGER_FIELDS = [
+	"material_request",
+	"material_request_item",
+	"company",
+	"schedule_date",
+	"supplier",
+	"item_code",
+	"item_name",
+	"warehouse",
+	"requires_rfq",
+	"qty",
+	"open_qty",
+	"draft_po_qty",
+	"uom",
+	"rate",
+	"amount",
+]
+
+
+def sync_open_material_demand(doc, method=None):
+	"""
+	doc_events hook that refreshes the Open Material Demand rows of every Material Request Item
+	touched by a Material Request, Purchase Order, Purchase Receipt, Stock Entry, Work Order or
+	Item (Item Supplier) change
+	"""
+	if doc.doctype == "Material Request":
+		# rows removed from the Material Request are no longer in doc.items
+		OpenMaterialDemand = DocType("Open Material Demand")
+		frappe.qb.from_(OpenMaterialDemand).delete().where(
+			OpenMaterialDemand.material_request == doc.name
+		).run()
+		material_request_items = [row.name for row in doc.items]
+		if material_request_items:
+			insert_open_material_demand(get_open_material_demand(material_request_items))
+		return
+	elif doc.doctype == "Work Order":
+		material_request_items = [doc.material_request_item]
+	elif doc.doctype == "Item":
+		material_request_items = frappe.get_all(
+			"Material Request Item", {"item_code": doc.name, "docstatus": ["<", 2]}, pluck="name"
+		)
+	else:
+		# also refresh the Material Request Items of rows removed since the last save
+		doc_before_save = doc.get_doc_before_save()
+		rows = doc.items + (doc_before_save.items if doc_before_save else [])
+		material_request_items = [row.get("material_request_item") for row in rows]
+
+	update_open_material_demand(material_request_items)
+
+
+def update_open_material_demand(material_request_items):
+	"""
+	Replaces the Open Material Demand rows for the given Material Request Items with their
+	current state
+
+	:param material_request_items: list of Material Request Item names
+	:return: None
+	"""
+	material_request_items = list({mri for mri in material_request_items if mri})
+	if not material_request_items:
+		return
+
+	OpenMaterialDemand = DocType("Open Material Demand")
+	frappe.qb.from_(OpenMaterialDemand).delete().where(
+		OpenMaterialDemand.material_request_item.isin(material_request_items)
+	).run()
+	insert_open_material_demand(get_open_material_demand(material_request_items))
+
+
+@frappe.whitelist()
+def rebuild_open_material_demand():
+	"""
+	Rebuilds the whole Open Material Demand table from open Material Requests; used on install,
+	as a daily correction for changes made outside of the tracked document events and on demand
+	"""
+	if frappe.session.user != "Administrator":
+		frappe.only_for("System Manager")
+
+	OpenMaterialDemand = DocType("Open Material Demand")
+	frappe.qb.from_(OpenMaterialDemand).delete().run()
+	insert_open_material_demand(get_open_material_demand())
+
+
+def get_open_material_demand(material_request_items=None):
+	"""
+	Collects one row per open Material Request Item and Item Supplier, with the quantity on
+	draft Purchase Orders
+
+	:param material_request_items: list of Material Request Item names; all open items if None
+	:return: list of dicts
+	"""
+	MaterialRequest = DocType("Material Request")
+	MaterialRequestItem = DocType("Material Request Item")
+	ItemSupplier = DocType("Item Supplier")
+	query = (
+		frappe.qb.from_(MaterialRequest)
+		.join(MaterialRequestItem)
+		.on(MaterialRequest.name == MaterialRequestItem.parent)
+		.join(ItemSupplier)
+		.on(ItemSupplier.parent == MaterialRequestItem.item_code)
+		.select(
+			MaterialRequest.name.as_("material_request"),
+			MaterialRequestItem.name.as_("material_request_item"),
+			MaterialRequest.company,
+			MaterialRequest.schedule_date,
+			Coalesce(ItemSupplier.supplier, "No Supplier").as_("supplier"),
+			ItemSupplier.requires_rfq,
+			MaterialRequestItem.item_code,
+			MaterialRequestItem.item_name,
+			MaterialRequestItem.warehouse,
+			MaterialRequestItem.qty,
+			MaterialRequestItem.stock_qty,
+			MaterialRequestItem.ordered_qty,
+			MaterialRequestItem.received_qty,
+			MaterialRequestItem.conversion_factor,
+			MaterialRequestItem.uom,
+			MaterialRequestItem.rate,
+			MaterialRequestItem.amount,
+		)
+		.distinct()
+		.where(MaterialRequest.docstatus < 2)
+		.where(MaterialRequestItem.ordered_qty < MaterialRequestItem.stock_qty)
+		.where(MaterialRequestItem.received_qty < MaterialRequestItem.stock_qty)
+	)
+	if material_request_items:
+		query = query.where(MaterialRequestItem.name.isin(material_request_items))
+
+	data = query.run(as_dict=True)
+	draft_pos = get_draft_po_qty([row.material_request_item for row in data])
+	for row in data:
+		row.open_qty = (row.stock_qty - max(row.ordered_qty, row.received_qty)) / (
+			row.conversion_factor or 1
+		)
+		row.draft_po_qty = draft_pos.get(row.material_request_item) or 0
+	return data
+
+
+def insert_open_material_demand(data):
+	if not data:
+		return
+
+	timestamp = now()
+	user = frappe.session.user
+	fields = ["name", "creation", "modified", "owner", "modified_by", *LEDGER_FIELDS]
+	values = [
+		(
+			frappe.generate_hash(length=10),
+			timestamp,
+			timestamp,
+			user,
+			user,
+			*(row.get(fieldname) for fieldname in LEDGER_FIELDS),
+		)
+		for row in data
+	]
+	frappe.db.bulk_insert("Open Material Demand", fields, values)
+
+
+def get_draft_po_qty(material_request_items):
+	"""
+	Collects the total quantity on draft Purchase Orders for each of the given Material Request
+	Items in a single grouped query
+
+	:param material_request_items: list of Material Request Item names
+	:return: dict; Material Request Item name -> draft Purchase Order qty
+	"""
+	material_request_items = list(set(material_request_items))
+	if not material_request_items:
+		return {}
+
+	PurchaseOrderItem = DocType("Purchase Order Item")
+	draft_pos = (
+		frappe.qb.from_(PurchaseOrderItem)
+		.select(PurchaseOrderItem.material_request_item, Sum(PurchaseOrderItem.qty).as_("qty"))
+		.where(PurchaseOrderItem.docstatus == 0)
+		.where(PurchaseOrderItem.material_request_item.isin(material_request_items))
+		.groupby(PurchaseOrderItem.material_request_item)
+	).run(as_dict=True)
+	return {row.material_request_item: row.qty for row in draft_pos}
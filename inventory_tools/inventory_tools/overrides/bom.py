@@ -0,0 +1,175 @@
+# Copyright (c) 2026, AgriTheory and contributors
+# For license information, please see license.txt
+
+import frappe
+
+BOM_EXPLOSION_CACHE_KEY = "inventory_tools_bom_explosion"
+BOM_EXPLOSION_TTL = 60 * 60
+
+
+def get_bom_explosions(boms):
+	"""
+	Returns the flattened tree of each given BOM from the Redis cache, exploding and caching any
+	that are missing. Entries are keyed by BOM name and modified timestamp, and the whole cache
+	expires BOM_EXPLOSION_TTL seconds after it is first written.
+
+	Each row holds parent_bom, bom (sub-assembly BOM, if any), item, description,
+	qty_per_parent_bom (BOM Item stock_qty), bom_uom, bom_quantity (the parent BOM's quantity),
+	qty_ratio (qty_per_parent_bom / bom_quantity), stock_qty (cumulative per unit of the root),
+	indent (1 for direct children of the root) and path, in depth-first order.
+
+	:param boms: list of BOM names
+	:return: dict; BOM name -> list of rows
+	"""
+	boms = list({bom for bom in boms if bom})
+	if not boms:
+		return {}
+
+	cache = frappe.cache()
+	modified = dict(frappe.get_all("BOM", {"name": ["in", boms]}, ["name", "modified"], as_list=1))
+	explosions, missing = {}, []
+	for bom_no in boms:
+		explosion = cache.hget(BOM_EXPLOSION_CACHE_KEY, get_cache_field(bom_no, modified.get(bom_no)))
+		if explosion is None:
+			missing.append(bom_no)
+		else:
+			explosions[bom_no] = [frappe._dict(row) for row in explosion]
+
+	if missing:
+		# submitted BOMs are read from the Flat BOM Explosion table, anything else is exploded
+		flat_explosions = get_flat_bom_explosions(missing)
+		unexploded = [bom_no for bom_no in missing if bom_no not in flat_explosions]
+		bom_children = explode_boms(unexploded) if unexploded else {}
+		for bom_no in missing:
+			explosions[bom_no] = flat_explosions.get(bom_no) or flatten_bom(bom_no, bom_children)
+			cache.hset(
+				BOM_EXPLOSION_CACHE_KEY, get_cache_field(bom_no, modified.get(bom_no)), explosions[bom_no]
+			)
+		# bound staleness from changes that bypass the BOM hooks; the TTL is only set once so
+		# frequent writes don't keep old entries alive
+		key = cache.make_key(BOM_EXPLOSION_CACHE_KEY)
+		if cache.ttl(key) < 0:
+			cache.expire(key, BOM_EXPLOSION_TTL)
+
+	return explosions
+
+
+def get_cache_field(bom_no, modified):
+	return f"{bom_no}::{modified}"
+
+
+def explode_boms(boms):
+	"""
+	Explodes BOM trees breadth-first, fetching the children of every BOM at a given depth in one
+	query. BOMs shared between branches are only fetched once.
+
+	:param boms: list; top-level BOM names
+	:return: dict; BOM name -> list of direct child rows
+	"""
+	BOM = frappe.qb.DocType("BOM")
+	BOM_ITEM = frappe.qb.DocType("BOM Item")
+
+	bom_children = {}
+	level = list(set(boms))
+	while level:
+		children = (
+			frappe.qb.from_(BOM)
+			.inner_join(BOM_ITEM)
+			.on(BOM.name == BOM_ITEM.parent)
+			.select(
+				(BOM_ITEM.parent).as_("parent_bom"),
+				(BOM_ITEM.bom_no).as_("bom"),
+				(BOM_ITEM.item_code).as_("item"),
+				BOM_ITEM.description,
+				(BOM_ITEM.stock_qty).as_("qty_per_parent_bom"),
+				(BOM_ITEM.stock_uom).as_("bom_uom"),
+				(BOM.quantity).as_("bom_quantity"),
+			)
+			.where((BOM_ITEM.parent.isin(level)) & (BOM_ITEM.parenttype == "BOM"))
+			.groupby(BOM_ITEM.parent, BOM_ITEM.item_code)
+			.orderby(BOM_ITEM.parent, BOM_ITEM.item_code)
+		).run(as_dict=True)
+
+		for bom_no in level:
+			bom_children[bom_no] = []
+		for child in children:
+			child.qty_ratio = child.qty_per_parent_bom / child.bom_quantity if child.bom_quantity else 0
+			bom_children[child.parent_bom].append(child)
+
+		level = list(
+			{
+				child.bom
+				for bom_no in level
+				for child in bom_children[bom_no]
+				if child.bom and child.bom not in bom_children
+			}
+		)
+
+	return bom_children
+
+
+def flatten_bom(bom_no, bom_children):
+	"""
+	Flattens a BOM tree depth-first with an explicit stack
+
+	:param bom_no: str; root BOM name
+	:param bom_children: dict; BOM name -> list of direct child rows, from explode_boms
+	:return: list of rows with their indent relative to the root, cumulative stock_qty per unit
+	of the root and path (the BOMs from the root to the row's parent, joined by " > ")
+	"""
+	rows = []
+	stack = [(child, 1, 1, bom_no) for child in reversed(bom_children.get(bom_no, []))]
+	while stack:
+		child, indent, parent_stock_qty, path = stack.pop()
+		row = frappe._dict(child)
+		row.update({"indent": indent, "stock_qty": row.qty_ratio * parent_stock_qty, "path": path})
+		rows.append(row)
+		if row.bom:
+			stack.extend(
+				(grandchild, indent + 1, row.stock_qty, f"{path} > {row.bom}")
+				for grandchild in reversed(bom_children.get(row.bom, []))
+			)
+	return rows
+
+
+def get_flat_bom_explosions(boms):
+	"""
+	Reads the flattened trees of the given BOMs from the Flat BOM Explosion table
+
+	:param boms: list of BOM names
+	:return: dict; BOM name -> list of rows, for BOMs that have been exploded into the table
+	"""
+	FLAT_BOM_EXPLOSION = frappe.qb.DocType("Flat BOM Explosion")
+	rows = (
+		frappe.qb.from_(FLAT_BOM_EXPLOSION)
+		.select(
+			FLAT_BOM_EXPLOSION.root_bom,
+			FLAT_BOM_EXPLOSION.parent_bom,
+			(FLAT_BOM_EXPLOSION.component_bom).as_("bom"),
+			(FLAT_BOM_EXPLOSION.component).as_("item"),
+			FLAT_BOM_EXPLOSION.description,
+			FLAT_BOM_EXPLOSION.qty_per_parent_bom,
+			(FLAT_BOM_EXPLOSION.stock_uom).as_("bom_uom"),
+			(FLAT_BOM_EXPLOSION.parent_bom_qty).as_("bom_quantity"),
+			FLAT_BOM_EXPLOSION.qty_ratio,
+			FLAT_BOM_EXPLOSION.stock_qty,
+			(FLAT_BOM_EXPLOSION.depth).as_("indent"),
+			FLAT_BOM_EXPLOSION.path,
+		)
+		.where(FLAT_BOM_EXPLOSION.root_bom.isin(boms))
+		.orderby(FLAT_BOM_EXPLOSION.root_bom, FLAT_BOM_EXPLOSION.idx)
+	).run(as_dict=True)
+
+	explosions = {}
+	for row in rows:
+		explosions.setdefault(row.pop("root_bom"), []).append(row)
+	return explosions
+
+
+def clear_bom_explosion_cache(doc, method=None):
+	"""
+	doc_events hook for BOM submit, cancel and update after submit (default BOM changes) and for
+	BOM Update Log changes (BOM Update Tool replacements write BOM Items without BOM hooks). A
+	parent BOM's flattened tree includes its sub-assembly BOMs, so the whole cache is evicted.
+	"""
+	frappe.cache().delete_key(BOM_EXPLOSION_CACHE_KEY)
@@ -4,6 +4,8 @@ import frappe
 from erpnext.manufacturing.doctype.production_plan.production_plan import ProductionPlan
 from erpnext.manufacturing.doctype.work_order.work_order import get_default_warehouse
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 class InventoryToolsProductionPlan(ProductionPlan):
 	@frappe.whitelist()
@@ -21,7 +23,8 @@ class InventoryToolsProductionPlan(ProductionPlan):
 
 		self.make_work_order_for_finished_goods(wo_list, default_warehouses)
 		self.make_work_order_for_subassembly_items(wo_list, subcontracted_po, default_warehouses)
-		if frappe.get_value("Inventory Tools Settings", self.company, "create_purchase_orders"):
+		settings = get_inventory_tools_settings(self.company)
+		if settings and settings.create_purchase_orders:
 			self.make_subcontracted_purchase_order(subcontracted_po, po_list)
 		self.show_list_created_message("Work Order", wo_list)
 		self.show_list_created_message("Purchase Order", po_list)
@@ -37,9 +40,8 @@ class InventoryToolsProductionPlan(ProductionPlan):
 		for row in self.sub_assembly_items:
 			if row.type_of_manufacturing == "Subcontract":
 				subcontracted_po.setdefault(row.supplier, []).append(row)
-				if not frappe.get_value(
-					"Inventory Tools Settings", self.company, "enable_work_order_subcontracting"
-				):
+				settings = get_inventory_tools_settings(self.company)
+				if not (settings and settings.enable_work_order_subcontracting):
 					continue
 
 			if row.type_of_manufacturing == "Material Request":
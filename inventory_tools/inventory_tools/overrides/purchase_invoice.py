@@ -9,6 +9,8 @@ from erpnext.accounts.doctype.purchase_invoice.purchase_invoice import PurchaseI
 from frappe import _
 from frappe.utils.data import cint
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 class InventoryToolsPurchaseInvoice(PurchaseInvoice):
 	def validate_with_previous_doc(self):
@@ -75,7 +77,7 @@ class InventoryToolsPurchaseInvoice(PurchaseInvoice):
 		return super().on_cancel()
 
 	def is_work_order_subcontracting_enabled(self):
-		settings = frappe.get_doc("Inventory Tools Settings", {"company": self.company})
+		settings = get_inventory_tools_settings(self.company)
 		return bool(settings and settings.enable_work_order_subcontracting)
 
 	def validate_subcontracting_to_pay_qty(self):
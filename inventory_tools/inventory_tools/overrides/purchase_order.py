@@ -18,6 +18,8 @@ from erpnext.controllers.accounts_controller import get_default_taxes_and_charge
 from erpnext.stock.utils import validate_disabled_warehouse, validate_warehouse_company
 from frappe import _, throw
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 def _bypass(*args, **kwargs):
 	return
@@ -62,7 +64,7 @@ class InventoryToolsPurchaseOrder(PurchaseOrder):
 
 	def validate_warehouse(self):
 		warehouses = []
-		inventory_tools_settings = frappe.get_doc("Inventory Tools Settings", self.company)
+		inventory_tools_settings = get_inventory_tools_settings(self.company, throw=True)
 
 		for d in self.get("items"):
 			if (
@@ -92,8 +94,37 @@ class InventoryToolsPurchaseOrder(PurchaseOrder):
 
 		super().validate()
 
+	def set_missing_item_details(self, for_validate=False):
+		"""
+		Validates every item row up front with one settings lookup and one Item query, so the
+		per-row validate_item_details can be skipped while ERPNext fetches each row's details
+		"""
+		import erpnext.stock.get_item_details
+
+		validate_items_details(
+			[
+				erpnext.stock.get_item_details.process_args(
+					{
+						"item_code": row.item_code,
+						"company": self.company,
+						"doctype": self.doctype,
+						"is_subcontracted": self.get("is_subcontracted"),
+						"is_old_subcontracting_flow": self.get("is_old_subcontracting_flow"),
+					}
+				)
+				for row in self.get("items")
+				if row.item_code
+			]
+		)
+		item_details_validated = frappe.flags.item_details_validated
+		frappe.flags.item_details_validated = True
+		try:
+			super().set_missing_item_details(for_validate)
+		finally:
+			frappe.flags.item_details_validated = item_details_validated
+
 	def is_work_order_subcontracting_enabled(self):
-		settings = frappe.get_doc("Inventory Tools Settings", {"company": self.company})
+		settings = get_inventory_tools_settings(self.company)
 		return bool(settings and settings.enable_work_order_subcontracting)
 
 	def validate_subcontracting_fg_qty(self):
@@ -118,7 +149,7 @@ class InventoryToolsPurchaseOrder(PurchaseOrder):
 def make_purchase_invoices(docname: str, rows: Union[list, str]) -> None:
 	rows = json.loads(rows) if isinstance(rows, str) else rows
 	doc = frappe.get_doc("Purchase Order", docname)
-	inventory_tools_settings = frappe.get_doc("Inventory Tools Settings", doc.company)
+	inventory_tools_settings = get_inventory_tools_settings(doc.company, throw=True)
 	forwarding = frappe._dict()
 	for row_name in rows:
 		for row in doc.items:
@@ -156,7 +187,7 @@ def make_purchase_invoices(docname: str, rows: Union[list, str]) -> None:
 def make_purchase_receipts(docname: str, rows: Union[list, str]) -> None:
 	rows = json.loads(rows) if isinstance(rows, str) else rows
 	doc = frappe.get_doc("Purchase Order", docname)
-	inventory_tools_settings = frappe.get_doc("Inventory Tools Settings", doc.company)
+	inventory_tools_settings = get_inventory_tools_settings(doc.company, throw=True)
 
 	forwarding = frappe._dict()
 	for row_name in rows:
@@ -272,6 +303,64 @@ def get_item_details(args, doc=None, for_validate=False, overwrite_warehouse=Tru
 	return out
 
 
+@frappe.whitelist()
+def get_items_details(args_list, doc=None, for_validate=False, overwrite_warehouse=True):
+	"""
+	Batched get_item_details for many rows of one transaction. Every row is validated up front
+	with one settings lookup per company and one Item query, then each row's details are fetched
+	without validating it again. Rows without an item_code are returned empty.
+
+	:param args_list: list of dicts (or JSON); the get_item_details args of each row
+	:param doc: dict | str; the parent transaction
+	:param for_validate: bool
+	:param overwrite_warehouse: bool
+	:return: list of get_item_details results, in the order of args_list
+	"""
+	import erpnext.stock.get_item_details
+
+	args_list = json.loads(args_list) if isinstance(args_list, str) else args_list
+	args_list = [erpnext.stock.get_item_details.process_args(args) for args in args_list]
+	doc = json.loads(doc) if isinstance(doc, str) else doc
+	validate_items_details([args for args in args_list if args.item_code])
+
+	item_details_validated = frappe.flags.item_details_validated
+	frappe.flags.item_details_validated = True
+	try:
+		return [
+			erpnext.stock.get_item_details.get_item_details(args, doc, for_validate, overwrite_warehouse)
+			if args.item_code
+			else frappe._dict()
+			for args in args_list
+		]
+	finally:
+		frappe.flags.item_details_validated = item_details_validated
+
+
+def validate_items_details(args_list):
+	"""
+	Runs validate_item_details for many rows against one Item query; settings are read once per
+	company through the cached accessor
+
+	:param args_list: list of processed get_item_details args, each with an item_code
+	:return: None
+	"""
+	if not args_list:
+		return
+
+	items = {
+		item.name: item
+		for item in frappe.get_all(
+			"Item",
+			{"name": ["in", list({args.item_code for args in args_list})]},
+			["name", "end_of_life", "disabled", "has_variants", "is_sub_contracted_item", "is_stock_item"],
+		)
+	}
+	for args in args_list:
+		if args.item_code not in items:
+			frappe.throw(_("Item {0} not found").format(args.item_code), frappe.DoesNotExistError)
+		validate_item_details(args, items[args.item_code])
+
+
 @frappe.whitelist()
 def validate_item_details(args, item):
 	"""
@@ -280,10 +369,14 @@ def validate_item_details(args, item):
 	PATH: erpnext/stock/get_item_details.py
 	METHOD: validate_item_details
 	"""
+	if frappe.flags.item_details_validated:
+		# the rows were already validated in one batch by validate_items_details
+		return
+
 	if not args.company:
 		throw(_("Please specify Company"))
 
-	settings = frappe.get_doc("Inventory Tools Settings", {"company": args.company})
+	settings = get_inventory_tools_settings(args.company)
 
 	from erpnext.stock.doctype.item.item import validate_end_of_life
 
@@ -5,11 +5,14 @@ import frappe
 from frappe.desk.reportview import execute
 from frappe.desk.search import search_link
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 @frappe.whitelist()
 def uom_restricted_query(doctype, txt, searchfield, start, page_len, filters):
 	company = frappe.defaults.get_defaults().get("company")
-	if frappe.get_cached_value("Inventory Tools Settings", company, "enforce_uoms"):
+	settings = get_inventory_tools_settings(company)
+	if settings and settings.enforce_uoms:
 		return execute(
 			"UOM Conversion Detail",
 			filters=filters,
@@ -33,7 +36,8 @@ def uom_restricted_query(doctype, txt, searchfield, start, page_len, filters):
 @frappe.whitelist()
 def validate_uom_has_conversion(doc, method=None):
 	company = doc.company if doc.get("company") else frappe.defaults.get_defaults().get("company")
-	if not frappe.get_cached_value("Inventory Tools Settings", company, "enforce_uoms"):
+	settings = get_inventory_tools_settings(company)
+	if not (settings and settings.enforce_uoms):
 		return
 	uom_enforcement = get_uom_enforcement()
 	if doc.doctype not in uom_enforcement:
@@ -4,16 +4,18 @@
 import frappe
 from frappe.desk.reportview import get_filters_cond, get_match_cond
 from frappe.desk.search import search_link
+from frappe.query_builder.functions import Sum
+
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
+WAREHOUSE_STOCK_CACHE_KEY = "inventory_tools_warehouse_stock"
+WAREHOUSE_STOCK_TTL = 60
 
 
 @frappe.whitelist()
 def update_warehouse_path(doc, method=None) -> None:
-	if not frappe.db.exists("Inventory Tools Settings", doc.company):
-		return
-	warehouse_path = frappe.db.get_value(
-		"Inventory Tools Settings", doc.company, "update_warehouse_path"
-	)
-	if not warehouse_path:
+	settings = get_inventory_tools_settings(doc.company)
+	if not (settings and settings.update_warehouse_path):
 		return
 
 	def get_parents(doc):
@@ -54,9 +56,8 @@ def warehouse_query(doctype, txt, searchfield, start, page_len, filters):
 	company = frappe.defaults.get_defaults().get("company")
 	if not company:
 		return search_link(doctype, txt, searchfield, start, page_len, filters)
-	if not frappe.db.exists("Inventory Tools Settings", company) and frappe.db.get_value(
-		"Inventory Tools Settings", company, "update_warehouse_path"
-	):
+	settings = get_inventory_tools_settings(company)
+	if not settings and (settings or {}).get("update_warehouse_path"):
 		return search_link(doctype, txt, searchfield, start, page_len, filters)
 	else:
 		doctype = "Warehouse"
@@ -82,3 +83,60 @@ def warehouse_query(doctype, txt, searchfield, start, page_len, filters):
 				"page_len": page_len or 20,
 			},
 		)
+
+
+def get_warehouse_stock(warehouse):
+	"""
+	Returns the stock of every item in a warehouse and all of its children, read from a cached
+	rollup that is rebuilt when it expires after WAREHOUSE_STOCK_TTL seconds
+
+	:param warehouse: str; Warehouse name, group or leaf
+	:return: dict; item_code -> {actual_qty, reserved_qty, projected_qty}
+	"""
+	if not warehouse:
+		return {}
+
+	key = f"{WAREHOUSE_STOCK_CACHE_KEY}::{warehouse}"
+	stock = frappe.cache().get_value(key)
+	if stock is None:
+		stock = get_warehouse_stock_rollup(warehouse)
+		frappe.cache().set_value(key, stock, expires_in_sec=WAREHOUSE_STOCK_TTL)
+	return stock
+
+
+def get_warehouse_stock_rollup(warehouse):
+	"""
+	Sums Bin quantities per item across the warehouse subtree given by its lft/rgt bounds in a
+	single grouped query
+
+	:param warehouse: str; Warehouse name
+	:return: dict; item_code -> {actual_qty, reserved_qty, projected_qty}
+	"""
+	BIN = frappe.qb.DocType("Bin")
+	WH = frappe.qb.DocType("Warehouse")
+	warehouse_details = frappe.db.get_value("Warehouse", warehouse, ["lft", "rgt"], as_dict=1)
+
+	query = frappe.qb.from_(BIN).select(
+		BIN.item_code,
+		Sum(BIN.actual_qty).as_("actual_qty"),
+		Sum(BIN.reserved_qty).as_("reserved_qty"),
+		Sum(BIN.projected_qty).as_("projected_qty"),
+	)
+	if warehouse_details:
+		query = (
+			query.inner_join(WH)
+			.on(BIN.warehouse == WH.name)
+			.where((WH.lft >= warehouse_details.lft) & (WH.rgt <= warehouse_details.rgt))
+		)
+	else:
+		query = query.where(BIN.warehouse == warehouse)
+
+	stock = query.groupby(BIN.item_code).run(as_dict=True)
+	return {
+		row.item_code: {
+			"actual_qty": row.actual_qty or 0,
+			"reserved_qty": row.reserved_qty or 0,
+			"projected_qty": row.projected_qty or 0,
+		}
+		for row in stock
+	}
@@ -10,6 +10,8 @@ from erpnext.manufacturing.doctype.work_order.work_order import (
 from frappe import _
 from frappe.utils import flt, get_link_to_form, getdate
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 
 class InventoryToolsWorkOrder(WorkOrder):
 	def onload(self):
@@ -39,7 +41,7 @@ class InventoryToolsWorkOrder(WorkOrder):
 		return super().on_cancel()
 
 	def is_work_order_subcontracting_enabled(self):
-		settings = frappe.get_doc("Inventory Tools Settings", {"company": self.company})
+		settings = get_inventory_tools_settings(self.company)
 		return bool(settings and settings.enable_work_order_subcontracting)
 
 	def validate_subcontracting_no_bom_ops(self):
@@ -98,9 +100,7 @@ class InventoryToolsWorkOrder(WorkOrder):
 	def create_job_card(self):
 		create_job_cards_automatically = (
 			frappe.db.get_value("BOM", self.bom_no, "create_job_cards_automatically")
-			or frappe.db.get_value(
-				"Inventory Tools Settings", {"company": self.company}, "create_job_cards_automatically"
-			)
+			or (get_inventory_tools_settings(self.company) or {}).get("create_job_cards_automatically")
 			or "Yes"
 		)
 
@@ -220,7 +220,7 @@ class InventoryToolsWorkOrder(WorkOrder):
 @frappe.whitelist()
 def make_subcontracted_purchase_order(wo_name, supplier=None):
 	company, bom_no = frappe.get_value("Work Order", wo_name, ["company", "bom_no"])
-	settings = frappe.get_doc("Inventory Tools Settings", {"company": company})
+	settings = get_inventory_tools_settings(company)
 	is_sc = frappe.get_value("BOM", bom_no, "is_subcontracted")
 
 	if settings and settings.enable_work_order_subcontracting and is_sc:
@@ -368,7 +368,7 @@ def add_to_existing_purchase_order(wo_name, po_name):
 	company, production_item, wo_qty, wo_stock_uom = frappe.get_value(
 		"Work Order", wo_name, ["company", "production_item", "qty", "stock_uom"]
 	)
-	settings = frappe.get_doc("Inventory Tools Settings", {"company": company})
+	settings = get_inventory_tools_settings(company)
 	if settings and settings.enable_work_order_subcontracting and po.get("is_subcontracted"):
 		frappe.flags.mute_messages = False
 		existing_po = in_existing_po(wo_name)
@@ -456,7 +456,7 @@ def add_to_existing_purchase_order(wo_name, po_name):
 @frappe.whitelist()
 def make_stock_entry(work_order_id, purpose, qty=None):
 	se = _make_stock_entry(work_order_id, purpose, qty)
-	settings = frappe.get_doc("Inventory Tools Settings", {"company": se.get("company")})
+	settings = get_inventory_tools_settings(se.get("company"))
 	if not (settings and settings.enable_work_order_subcontracting):
 		return se
 	supplier = frappe.db.get_value("Work Order", work_order_id, "supplier")
@@ -487,7 +487,7 @@ def get_allowance_percentage(company: str, bom_no: str):
 	if bom_allowance_percentage:
 		return flt(bom_allowance_percentage)
 
-	settings = frappe.get_doc("Inventory Tools Settings", {"company": company})
+	settings = get_inventory_tools_settings(company)
 	if settings:
 		settings_allowance_percentage = flt(settings.overproduction_percentage_for_work_order)
 	else:
@@ -2,6 +2,8 @@ import frappe
 from frappe.desk.reportview import execute
 from frappe.desk.search import search_link
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
 """
 	This function fetch workstation of the document operation.
 	In Operation you can select multiple workstations in Alternative Workstation field. 
@@ -29,9 +31,8 @@ from frappe.desk.search import search_link
 @frappe.validate_and_sanitize_search_inputs
 def get_alternative_workstations(doctype, txt, searchfield, start, page_len, filters):
 	company = filters.get("company") or frappe.defaults.get_defaults().get("company")
-	if not frappe.get_cached_value(
-		"Inventory Tools Settings", company, "allow_alternative_workstations"
-	):
+	settings = get_inventory_tools_settings(company)
+	if not (settings and settings.allow_alternative_workstations):
 		filters.pop("operation") if "operation" in filters else True
 		filters.pop("company") if "company" in filters else True
 		return execute(
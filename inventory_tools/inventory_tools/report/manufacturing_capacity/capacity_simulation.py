@@ -0,0 +1,230 @@
+# Copyright (c) 2026, AgriTheory and contributors
+# For license information, please see license.txt
+
+import json
+
+import frappe
+
+from inventory_tools.inventory_tools.overrides.bom import get_bom_explosions
+from inventory_tools.inventory_tools.report.manufacturing_capacity.manufacturing_capacity import (
+	get_stock,
+)
+
+FILL_RATE_ITERATIONS = 30
+
+
+@frappe.whitelist()
+def simulate_capacity(scenarios, warehouse):
+	"""
+	Evaluates many demand scenarios for a set of finished good BOMs against the stock in a
+	warehouse (and its children). Sub-assemblies in stock are used before their own components,
+	like in the Manufacturing Capacity report.
+
+	:param scenarios: list of dicts (or JSON); each maps BOM name -> demanded qty
+	:param warehouse: str; Warehouse to read availability from
+	:return: list of dicts, one per scenario, with:
+	    - demand: the scenario's BOM -> demanded qty
+	    - fill_rate: share of the whole scenario that can be built from stock (0 to 1)
+	    - buildable_qty: BOM -> qty that can be built when stock is shared at fill_rate
+	    - shortages: list of {item, required_qty, available_qty, shortage_qty} for raw materials
+	      that are short for the full demand
+	"""
+	if not frappe.get_doc("Report", "Manufacturing Capacity").is_permitted():
+		frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
+
+	scenarios = json.loads(scenarios) if isinstance(scenarios, str) else scenarios
+	scenarios = [{bom: float(qty or 0) for bom, qty in scenario.items()} for scenario in scenarios]
+	boms = {bom for scenario in scenarios for bom in scenario}
+
+	existing_boms = set(frappe.get_all("BOM", {"name": ["in", list(boms)]}, pluck="name"))
+	for bom_no in sorted(boms - existing_boms):
+		frappe.throw(frappe._("BOM {0} not found").format(bom_no), frappe.DoesNotExistError)
+
+	bom_children = get_bom_children(boms)
+	items = {child.item for children in bom_children.values() for child in children}
+	availability = get_stock(items, {"warehouse": warehouse})
+	return evaluate_scenarios(bom_children, availability, scenarios)
+
+
+def get_bom_children(boms):
+	"""
+	Collects the direct children of every BOM in the given BOMs' trees from the cached BOM
+	explosions, once per BOM no matter how many trees or branches use it
+
+	:param boms: list | set of BOM names
+	:return: dict; BOM name -> list of child rows with item, bom (sub-assembly BOM, if any) and
+	qty_ratio (stock qty per unit of the parent BOM)
+	"""
+	bom_children = {}
+	for bom_no, explosion in get_bom_explosions(boms).items():
+		# BOMs already collected were fully explored as part of an earlier tree
+		known = set(bom_children)
+		seen = set()
+		bom_children.setdefault(bom_no, [])
+		for row in explosion:
+			if row.parent_bom in known or (row.parent_bom, row.item) in seen:
+				continue
+			seen.add((row.parent_bom, row.item))
+			bom_children.setdefault(row.parent_bom, []).append(
+				frappe._dict(item=row.item, bom=row.bom, qty_ratio=row.qty_ratio)
+			)
+	return bom_children
+
+
+def get_build_order(bom_children):
+	"""
+	Orders the BOMs so every BOM comes before the sub-assembly BOMs it uses (reverse post-order)
+
+	:param bom_children: dict; BOM name -> list of child rows, from get_bom_children
+	:return: list of BOM names
+	"""
+	order, visited = [], set()
+	for bom_no in bom_children:
+		stack = [(bom_no, False)]
+		while stack:
+			node, expanded = stack.pop()
+			if expanded:
+				order.append(node)
+				continue
+			if node in visited:
+				continue
+			visited.add(node)
+			stack.append((node, True))
+			stack.extend(
+				(child.bom, False)
+				for child in bom_children.get(node, [])
+				if child.bom and child.bom not in visited
+			)
+	return order[::-1]
+
+
+def get_requirement_matrix(bom_children, build_order, demand_matrix, availability):
+	"""
+	Builds a sparse raw material requirement matrix with one column per demand scenario. The BOM
+	tree is walked once for all scenarios, netting each scenario's demand against the stock of
+	sub-assemblies level by level; sub-assembly stock is shared between every BOM that uses it.
+
+	:param bom_children: dict; BOM name -> list of child rows, from get_bom_children
+	:param build_order: list; BOM names, parents first, from get_build_order
+	:param demand_matrix: dict; BOM name -> list of qty to build, one per scenario
+	:param availability: dict; item_code -> available qty
+	:return: dict; raw material item_code -> list of required qty, one per scenario
+	"""
+	columns = len(next(iter(demand_matrix.values()), []))
+	build_qty = {bom_no: list(qtys) for bom_no, qtys in demand_matrix.items()}
+	sub_assembly_stock = {}
+	requirements = {}
+	for bom_no in build_order:
+		qtys = build_qty.get(bom_no)
+		if not qtys or not any(qtys):
+			continue
+		for child in bom_children.get(bom_no, []):
+			required_qtys = [qty * child.qty_ratio for qty in qtys]
+			if not child.bom:
+				row = requirements.setdefault(child.item, [0] * columns)
+				for column, required_qty in enumerate(required_qtys):
+					row[column] += required_qty
+				continue
+			in_stock_qtys = sub_assembly_stock.setdefault(
+				child.item, [max(availability.get(child.item) or 0, 0)] * columns
+			)
+			child_build_qtys = build_qty.setdefault(child.bom, [0] * columns)
+			for column, required_qty in enumerate(required_qtys):
+				used_qty = min(in_stock_qtys[column], required_qty)
+				in_stock_qtys[column] -= used_qty
+				child_build_qtys[column] += required_qty - used_qty
+	return requirements
+
+
+def get_raw_requirements(bom_children, build_order, demand, availability):
+	"""
+	Nets a single demand against the stock of sub-assemblies and returns what is left to source
+	from raw materials
+
+	:param bom_children: dict; BOM name -> list of child rows, from get_bom_children
+	:param build_order: list; BOM names, parents first, from get_build_order
+	:param demand: dict; BOM name -> qty to build
+	:param availability: dict; item_code -> available qty
+	:return: dict; raw material item_code -> required qty
+	"""
+	demand_matrix = {bom_no: [qty] for bom_no, qty in demand.items()}
+	requirements = get_requirement_matrix(bom_children, build_order, demand_matrix, availability)
+	return {item_code: qtys[0] for item_code, qtys in requirements.items()}
+
+
+def evaluate_scenarios(bom_children, availability, scenarios):
+	"""
+	Evaluates all scenarios together against the available stock. Each requirement matrix covers
+	every scenario at once; for the scenarios whose full demand can't be met, the fill rate is
+	found by bisecting all of them in the same passes, since netting sub-assembly stock makes the
+	raw material requirements non-linear in the demand.
+
+	:param bom_children: dict; BOM name -> list of child rows, from get_bom_children
+	:param availability: dict; item_code -> available qty
+	:param scenarios: list of dicts; BOM name -> demanded qty
+	:return: list of dicts; see simulate_capacity
+	"""
+	build_order = get_build_order(bom_children)
+	boms = {bom for demand in scenarios for bom in demand}
+
+	def get_requirements(fill_rates, columns):
+		demand_matrix = {
+			bom: [
+				scenarios[column].get(bom, 0) * fill_rate
+				for column, fill_rate in zip(columns, fill_rates)
+			]
+			for bom in boms
+		}
+		return get_requirement_matrix(bom_children, build_order, demand_matrix, availability)
+
+	def is_short(requirements, column):
+		return any(
+			qtys[column] > max(availability.get(item_code) or 0, 0)
+			for item_code, qtys in requirements.items()
+		)
+
+	columns = list(range(len(scenarios)))
+	requirements = get_requirements([1.0] * len(columns), columns)
+	fill_rates = [1.0] * len(columns)
+
+	short_columns = [column for column in columns if is_short(requirements, column)]
+	low, high = [0.0] * len(short_columns), [1.0] * len(short_columns)
+	for _ in range(FILL_RATE_ITERATIONS if short_columns else 0):
+		middle = [(lo + hi) / 2 for lo, hi in zip(low, high)]
+		middle_requirements = get_requirements(middle, short_columns)
+		for index in range(len(short_columns)):
+			if is_short(middle_requirements, index):
+				high[index] = middle[index]
+			else:
+				low[index] = middle[index]
+	for index, column in enumerate(short_columns):
+		fill_rates[column] = low[index]
+
+	results = []
+	for column, demand in enumerate(scenarios):
+		shortages = []
+		for item_code, qtys in sorted(requirements.items()):
+			available_qty = max(availability.get(item_code) or 0, 0)
+			if qtys[column] > available_qty:
+				shortages.append(
+					{
+						"item": item_code,
+						"required_qty": qtys[column],
+						"available_qty": available_qty,
+						"shortage_qty": qtys[column] - available_qty,
+					}
+				)
+		results.append(
+			frappe._dict(
+				{
+					"demand": demand,
+					"fill_rate": fill_rates[column],
+					"buildable_qty": {
+						bom: int(demanded_qty * fill_rates[column])
+						for bom, demanded_qty in demand.items()
+					},
+					"shortages": shortages,
+				}
+			)
+		)
+	return results
@@ -7,9 +7,12 @@ frappe.query_reports['Manufacturing Capacity'] = {
 		{
 			fieldname: 'bom',
 			label: __('BOM'),
-			fieldtype: 'Link',
+			fieldtype: 'MultiSelectList',
 			options: 'BOM',
 			reqd: 1,
+			get_data: txt => {
+				return frappe.db.get_link_options('BOM', txt, { docstatus: 1 })
+			},
 		},
 		{
 			fieldname: 'warehouse',
@@ -19,6 +22,11 @@ frappe.query_reports['Manufacturing Capacity'] = {
 			reqd: 1,
 		},
 	],
+	onload: function (reportview) {
+		reportview.page.add_menu_item(__('Compare Snapshots'), () => {
+			compare_snapshots()
+		})
+	},
 	formatter: function (value, row, column, data, default_formatter) {
 		value = default_formatter(value, row, column, data)
 
@@ -28,3 +36,71 @@ frappe.query_reports['Manufacturing Capacity'] = {
 		return value
 	},
 }
+
+function compare_snapshots() {
+	const snapshot_filters = { report_name: 'Manufacturing Capacity', status: 'Completed' }
+	frappe.prompt(
+		[
+			{
+				fieldtype: 'Link',
+				fieldname: 'from_snapshot',
+				label: __('From Snapshot'),
+				options: 'Prepared Report',
+				reqd: 1,
+				get_query: () => ({ filters: snapshot_filters }),
+			},
+			{
+				fieldtype: 'Link',
+				fieldname: 'to_snapshot',
+				label: __('To Snapshot'),
+				options: 'Prepared Report',
+				reqd: 1,
+				get_query: () => ({ filters: snapshot_filters }),
+			},
+		],
+		async values => {
+			let changes = await frappe.xcall(
+				'inventory_tools.inventory_tools.report.manufacturing_capacity.manufacturing_capacity.compare_snapshots',
+				values
+			)
+			show_snapshot_changes(changes)
+		},
+		__('Compare Snapshots'),
+		__('Compare')
+	)
+}
+
+function show_snapshot_changes(changes) {
+	if (!changes.length) {
+		frappe.msgprint(__('No changes between these snapshots'))
+		return
+	}
+	const fields = ['demanded_qty', 'in_stock_qty', 'parts_can_build_qty', 'difference_qty']
+	const labels = [__('Demanded Qty'), __('In Stock Qty'), __('Parts Can Build'), __('Difference Qty')]
+	let rows = changes.map(change => {
+		let cells = fields.map(
+			field => `<td>${change[`from_${field}`]} &rarr; ${change[`to_${field}`]}</td>`
+		)
+		return `<tr>
+			<td>${frappe.utils.escape_html(change.root_bom || '')}</td>
+			<td>${frappe.utils.escape_html(change.parent_bom || '')}</td>
+			<td>${frappe.utils.escape_html(change.item || '')}</td>
+			<td>${__(change.status)}</td>
+			${cells.join('')}
+		</tr>`
+	})
+	frappe.msgprint({
+		title: __('Snapshot Changes'),
+		wide: true,
+		message: `<table class="table table-bordered">
+			<thead><tr>
+				<th>${__('Root BOM')}</th>
+				<th>${__('Parent BOM')}</th>
+				<th>${__('Item')}</th>
+				<th>${__('Status')}</th>
+				${labels.map(label => `<th>${label}</th>`).join('')}
+			</tr></thead>
+			<tbody>${rows.join('')}</tbody>
+		</table>`,
+	})
+}
@@ -2,9 +2,12 @@
 # For license information, please see license.txt
 
 import frappe
+from frappe.desk.query_report import get_prepared_report_result
 from frappe.query_builder import Criterion
 from frappe.query_builder.functions import Sum
-from pypika.terms import ExistsCriterion
+
+from inventory_tools.inventory_tools.overrides.bom import get_bom_explosions
+from inventory_tools.inventory_tools.overrides.warehouse import get_warehouse_stock
 
 
 def execute(filters=None):
@@ -81,56 +84,119 @@ def get_columns(filters=None):
 
 
 def get_data(filters=None):
+	selected_boms = get_selected_boms(filters)
+	bom_graph = get_bom_graph()
 	parent_set = set()
-	get_bom_parents(filters.get("bom"), parent_set)
+	for bom_no in selected_boms:
+		get_bom_parents(bom_no, parent_set, bom_graph)
 	bom_data = []
 
+	demand = get_demand(bom_graph.bom_item.get(bom_no) for bom_no in parent_set)
+	root_data = get_bom_data(list(parent_set), filters)
+	explosions = get_bom_explosions(parent_set)
+	stock = get_stock([row.item for explosion in explosions.values() for row in explosion], filters)
+
+	# Sub-assemblies shared between roots (or within a tree) are nodes of a single DAG for the run,
+	# so their child rows and parts can build qty are only computed once
+	bom_dag = get_bom_dag(explosions, stock)
+	parts_can_build = get_parts_can_build(bom_dag)
+
 	for idx, bom_no in enumerate(parent_set, 1):
 		filters["root_parent_index"] = idx
-		demanded_qty = get_total_demand(bom_no)
+		demanded_qty = demand.get(bom_graph.bom_item.get(bom_no), 0)
 		indent = 0
 
 		# Append the root parent-level BOM data
-		parent_data = get_bom_data(bom_no, demanded_qty, filters, indent, is_root=True)[0]
+		parent_data = frappe._dict(root_data[bom_no])
+		parent_data.update(
+			{
+				"demanded_qty": demanded_qty,
+				"is_selected_bom": int(parent_data.bom in selected_boms),
+				"parent_bom": "",
+				"root_parent_index": idx,
+				"indent": indent,
+			}
+		)
 		bom_data.append(parent_data)
-		parent_index = len(bom_data) - 1
 
 		# Append sub-level BOM data
-		get_child_bom_data(bom_no, bom_data, demanded_qty, filters, indent=indent + 1, is_root=False)
+		get_child_bom_data(bom_data, demanded_qty, explosions[bom_no], stock, filters)
 
-		# Find the parts_can_build_qty for BOM levels - calculated as min of that BOM's children's parts_can_build_qty
-		bom_data[parent_index]["parts_can_build_qty"] = set_min_can_build(
-			idx, indent + 1, parent_data.bom, bom_data
+		frappe.publish_progress(
+			idx * 100 / len(parent_set),
+			title=frappe._("Manufacturing Capacity"),
+			description=frappe._("Processed BOM {0} of {1}: {2}").format(idx, len(parent_set), bom_no),
 		)
 
-	# Recalculate the difference quantity for all rows
-	# - BOM rows: in_stock_qty + parts_can_build_qty - demanded_qty (parts can build based off sub-assembly availability, NOT what's already in stock, so need to include that separately)
-	# - Raw materials rows: parts_can_build_qty - demanded_qty (parts can build based off what's in stock, so already accounted for)
-	for row in bom_data:
-		if row.bom:
-			row.difference_qty = row.in_stock_qty + row.parts_can_build_qty - row.demanded_qty
-		else:
-			row.difference_qty = row.parts_can_build_qty - row.demanded_qty
+	# Find the parts_can_build_qty for BOM levels - calculated as min of that BOM's children's
+	# parts_can_build_qty - and the difference_qty for all rows
+	set_min_can_build(bom_data, parts_can_build)
 
 	return bom_data
 
 
-def get_bom_parents(bom_no, parent_set):
+def get_selected_boms(filters):
+	"""
+	Returns the BOMs selected in the report's multi-select bom filter, which may also be given as a
+	single BOM name or a JSON list
+
+	:param filters: dict; holds report inputs
+	:return: set of BOM names
+	"""
+	boms = filters.get("bom") or []
+	if isinstance(boms, str):
+		boms = frappe.parse_json(boms) if boms.startswith("[") else [boms]
+	return set(boms)
+
+
+def get_bom_graph():
+	"""
+	Loads the BOM hierarchy in two queries and indexes it by item_code: the item each BOM makes,
+	the BOMs that make each item and the BOMs that use each item as a component
+
+	:return: frappe._dict; bom_item (BOM -> item), item_boms (item -> BOMs) and item_parent_boms
+	(item -> parent BOMs)
+	"""
+	graph = frappe._dict(bom_item={}, item_boms={}, item_parent_boms={})
+	for bom in frappe.get_all("BOM", fields=["name", "item"]):
+		graph.bom_item[bom.name] = bom.item
+		graph.item_boms.setdefault(bom.item, []).append(bom.name)
+
+	BOM_ITEM = frappe.qb.DocType("BOM Item")
+	bom_items = (
+		frappe.qb.from_(BOM_ITEM)
+		.select(BOM_ITEM.item_code, BOM_ITEM.parent)
+		.distinct()
+		.where(BOM_ITEM.parenttype == "BOM")
+	).run(as_dict=True)
+	for bom_item in bom_items:
+		graph.item_parent_boms.setdefault(bom_item.item_code, []).append(bom_item.parent)
+
+	return graph
+
+
+def get_bom_parents(bom_no, parent_set, bom_graph=None):
 	"""
-	Given the name of a BOM and a set, recursively looks for the top-level parent BOM and collects
-	them in parent_set
+	Given the name of a BOM and a set, walks up the BOM hierarchy to find the top-level parent
+	BOMs and collects them in parent_set. Shared sub-trees are visited once and cycles are ignored.
 
-	:param bom_name: str, name of a BOM
+	:param bom_no: str, name of a BOM
 	:param parent_set: set
+	:param bom_graph: frappe._dict; from get_bom_graph, loaded if not provided
 	:return: None; set is manipulated in place
 	"""
-	item = frappe.get_value("BOM", bom_no, "item")
-	parents = frappe.get_all("BOM Item", {"item_name": item}, "parent")
-	if not parents:
-		parent_set.add(bom_no)
-	else:
-		for p in parents:
-			get_bom_parents(p["parent"], parent_set)
+	bom_graph = bom_graph or get_bom_graph()
+	visited = set()
+	stack = [bom_no]
+	while stack:
+		bom = stack.pop()
+		if bom in visited:
+			continue
+		visited.add(bom)
+		parents = bom_graph.item_parent_boms.get(bom_graph.bom_item.get(bom), [])
+		if not parents:
+			parent_set.add(bom)
+		stack.extend(parents)
 
 
 def get_total_demand(bom_no):
@@ -144,6 +210,22 @@ def get_total_demand(bom_no):
 	:return: int | float
 	"""
 	item = frappe.get_value("BOM", bom_no, "item")
+	return get_demand([item]).get(item, 0)
+
+
+def get_demand(items):
+	"""
+	Collects the manufacturing demand for a set of items with one grouped query per source:
+	outstanding Sales Orders, Material Requests of type "Manufacture", and Work Orders. For SOs
+	and MRs, nets out the ordered quantity (accounted for in Work Orders created off them) and
+	for WOs, nets out any produced quantity.
+
+	:param items: list | set of item codes
+	:return: dict; item_code -> int | float, items without demand are omitted
+	"""
+	items = list({item for item in items if item})
+	if not items:
+		return {}
 
 	so = frappe.qb.DocType("Sales Order")
 	so_item = frappe.qb.DocType("Sales Order Item")
@@ -154,13 +236,14 @@ def get_total_demand(bom_no):
 		.inner_join(so_item)
 		.on(so_item.parent == so.name)
 		.select(
+			(so_item.item_code).as_("item"),
 			(Sum(so_item.stock_qty - so_item.work_order_qty)).as_(
 				"total"
-			)  # removes anything accounted for on a Work Order
+			),  # removes anything accounted for on a Work Order
 		)
 		.where(so.docstatus == 1)
 		.where(Criterion.any(so_status_criteria))
-		.where(so_item.item_code == item)
+		.where(so_item.item_code.isin(items))
 		.groupby(so_item.item_code)
 	).run(as_dict=True)
 
@@ -172,14 +255,15 @@ def get_total_demand(bom_no):
 		.inner_join(mr_item)
 		.on(mr_item.parent == mr.name)
 		.select(
+			(mr_item.item_code).as_("item"),
 			(Sum(mr_item.stock_qty - mr_item.ordered_qty)).as_(
 				"total"
-			)  # removes ordered-qty, labeled as "Completed Qty" (accounted for in a Work Order)
+			),  # removes ordered-qty, labeled as "Completed Qty" (accounted for in a Work Order)
 		)
 		.where(mr.docstatus == 1)
 		.where(mr.status != "Stopped")
 		.where(mr.material_request_type == "Manufacture")
-		.where(mr_item.item_code == item)
+		.where(mr_item.item_code.isin(items))
 		.groupby(mr_item.item_code)
 	).run(as_dict=True)
 
@@ -188,151 +272,262 @@ def get_total_demand(bom_no):
 
 	wo_query = (
 		frappe.qb.from_(wo)
-		.select((Sum(wo.qty - wo.produced_qty)).as_("total"))
+		.select((wo.production_item).as_("item"), (Sum(wo.qty - wo.produced_qty)).as_("total"))
 		.where(wo.docstatus == 1)
-		.where(wo.production_item == item)
+		.where(wo.production_item.isin(items))
 		.where(Criterion.any(wo_status_criteria))
 		.groupby(wo.production_item)
 	).run(as_dict=True)
 
-	all_totals = so_query + mr_query + wo_query
-	return sum(d["total"] for d in all_totals)
+	demand = {}
+	for row in so_query + mr_query + wo_query:
+		demand[row["item"]] = demand.get(row["item"], 0) + row["total"]
+	return demand
 
 
-def get_bom_data(bom_no, demanded_qty, filters, indent, is_root=False):
+def get_stock(items, filters):
 	"""
-	Collects column data for either parent BOM (top-level) if is_root is True, or the BOM Item
-	data for all of the given BOM's children
-
-	:param bom_no: str; BOM name to collect data for
-	:demanded_qty: int | float; the total demand for given BOM's item
-	:filters: dict; contains the data (BOM and Warehouse) passed on by user
-	:indent: int; current level in BOM hierarchy
-	:is_root: bool; True if the given bom_no is the top-level parent in a hierarchy,
-	False if not
+	Looks up the actual qty in the selected warehouse (and its children) for a set of items from
+	the cached warehouse stock rollup
+
+	:param items: list | set of item codes
+	:param filters: dict; contains the data (BOM and Warehouse) passed on by user
+	:return: dict; item_code -> actual qty
 	"""
-	warehouse_details = frappe.db.get_value(
-		"Warehouse", filters.get("warehouse"), ["lft", "rgt"], as_dict=1
-	)
+	warehouse_stock = get_warehouse_stock(filters.get("warehouse"))
+	return {item: warehouse_stock[item]["actual_qty"] for item in items if item in warehouse_stock}
+
+
+def get_bom_data(boms, filters):
+	"""
+	Collects column data for a set of top-level parent BOMs in one query, with their stock from
+	the cached warehouse stock rollup. demanded_qty is left for the caller.
+
+	:param boms: list; BOM names to collect data for
+	:param filters: dict; contains the data (BOM and Warehouse) passed on by user
+	:return: dict; BOM name -> row
+	"""
+	if not boms:
+		return {}
 
 	BOM = frappe.qb.DocType("BOM")
 	ITEM = frappe.qb.DocType("Item")
-	BOM_ITEM = frappe.qb.DocType("BOM Item")
-	BIN = frappe.qb.DocType("Bin")
-	WH = frappe.qb.DocType("Warehouse")
-	CONDITIONS = ()
-
-	if warehouse_details:
-		CONDITIONS = ExistsCriterion(
-			frappe.qb.from_(WH)
-			.select(WH.name)
-			.where(
-				(WH.lft >= warehouse_details.lft)
-				& (WH.rgt <= warehouse_details.rgt)
-				& (BIN.warehouse == WH.name)
-			)
-		)
-	else:
-		CONDITIONS = BIN.warehouse == filters.get("warehouse")
-
-	if is_root:
-		query = (
-			frappe.qb.from_(BOM)
-			.inner_join(ITEM)
-			.on(BOM.item == ITEM.item_code)
-			.left_join(BIN)
-			.on((ITEM.item_code == BIN.item_code) & (CONDITIONS))
-			.select(
-				(BOM.name).as_("bom"),
-				(BOM.item).as_("item"),
-				ITEM.description,
-				(BOM.quantity).as_("qty_per_parent_bom"),
-				(ITEM.stock_uom).as_("bom_uom"),
-				(BOM.quantity * demanded_qty / BOM.quantity).as_(
-					"demanded_qty"
-				),  # redundant calc but needs cols and avoid errors
-				Sum(BIN.actual_qty).as_("in_stock_qty"),
-				Sum(BIN.actual_qty).as_("orig_parts_can_build_qty"),
-			)
-			.where(BOM.name == bom_no)
-			.groupby(BOM.item)
-		)
-	else:
-		query = (
-			frappe.qb.from_(BOM)
-			.inner_join(BOM_ITEM)
-			.on(BOM.name == BOM_ITEM.parent)
-			.left_join(BIN)
-			.on((BOM_ITEM.item_code == BIN.item_code) & (CONDITIONS))
-			.select(
-				(BOM_ITEM.bom_no).as_("bom"),
-				(BOM_ITEM.item_code).as_("item"),
-				BOM_ITEM.description,
-				(BOM_ITEM.stock_qty).as_("qty_per_parent_bom"),
-				(BOM_ITEM.stock_uom).as_("bom_uom"),
-				(BOM_ITEM.stock_qty * demanded_qty / BOM.quantity).as_("demanded_qty"),
-				Sum(BIN.actual_qty).as_("in_stock_qty"),
-				Sum(BIN.actual_qty / (BOM_ITEM.stock_qty / BOM.quantity)).as_("orig_parts_can_build_qty"),
-			)
-			.where((BOM_ITEM.parent == bom_no) & (BOM_ITEM.parenttype == "BOM"))
-			.groupby(BOM_ITEM.item_code)
+	results = (
+		frappe.qb.from_(BOM)
+		.inner_join(ITEM)
+		.on(BOM.item == ITEM.item_code)
+		.select(
+			(BOM.name).as_("bom"),
+			(BOM.item).as_("item"),
+			ITEM.description,
+			(BOM.quantity).as_("qty_per_parent_bom"),
+			(ITEM.stock_uom).as_("bom_uom"),
 		)
+		.where(BOM.name.isin(boms))
+	).run(as_dict=True)
 
-	results = query.run(as_dict=True)
+	stock = get_stock([r.item for r in results], filters)
 	for r in results:
-		r.update(
-			{
-				"in_stock_qty": r.in_stock_qty or 0,
-				"orig_parts_can_build_qty": int(r.orig_parts_can_build_qty)
-				if r.orig_parts_can_build_qty
-				else 0,
-				"is_selected_bom": int(r.bom == filters.get("bom")),
-				"parent_bom": "" if is_root else bom_no,
-				"root_parent_index": filters.get("root_parent_index") or 0,
-				"indent": indent,
-			}
-		)
+		in_stock_qty = stock.get(r.item) or 0
+		r.update({"in_stock_qty": in_stock_qty, "orig_parts_can_build_qty": int(in_stock_qty)})
 
-	return results
+	return {r.bom: r for r in results}
 
 
-def get_child_bom_data(bom_no, bom_data, demanded_qty, filters, indent=0, is_root=False):
+def get_child_bom_data(bom_data, demanded_qty, explosion, stock, filters):
 	"""
-	Recursively collects BOM tree data for a given 'parent' BOM, mutates bom_data in place
+	Collects BOM tree data for a given 'parent' BOM from its flattened explosion, mutates bom_data
+	in place
 
-	:param bom_no: str; parent BOM name
 	:param bom_data: list
 	:param demanded_qty: int | float; the demanded quantity (to produce) of parent BOM
+	:param explosion: list; the parent BOM's flattened tree, from get_bom_explosions
+	:param stock: dict; item_code -> actual qty in the selected warehouse
 	:filters: dict; holds report inputs
-	:indent: int; tracks the BOM levels
-	:is_root: bool; whether or not the current bom_no is the root parent BOM
 	    :return: None; appends children to bom_data list in place
 	"""
-	children_data = get_bom_data(bom_no, demanded_qty, filters, indent=indent, is_root=is_root)
-	for child in children_data:
-		bom_data.append(child)
-		if child.bom:
-			demanded_qty = child.demanded_qty
-			get_child_bom_data(child.bom, bom_data, demanded_qty, filters, indent=indent + 1)
+	# demanded qty of the most recent row at each indent, the parent of any row one level deeper
+	level_demand = {0: demanded_qty}
+	selected_boms = get_selected_boms(filters)
+	for child in explosion:
+		row = frappe._dict(child)
+		in_stock_qty = stock.get(row.item) or 0
+		row.update(
+			{
+				"demanded_qty": row.qty_ratio * level_demand[row.indent - 1],
+				"in_stock_qty": in_stock_qty,
+				"orig_parts_can_build_qty": int(in_stock_qty / row.qty_ratio) if row.qty_ratio else 0,
+				"is_selected_bom": int(row.bom in selected_boms),
+				"root_parent_index": filters.get("root_parent_index") or 0,
+			}
+		)
+		level_demand[row.indent] = row.demanded_qty
+		bom_data.append(row)
 
 
-def set_min_can_build(root_parent_index, indent, parent_bom, bom_data):
+def get_bom_dag(explosions, stock):
 	"""
-	Recursively finds and sets the parts_can_build_qty by finding the direct children of the current
-	    level in the hierarchy, and taking the minimum of their parts_can_build_qty
+	Builds the run's BOM DAG from the flattened explosions: each BOM's direct children once, no
+	matter how many trees or branches reference it
+
+	:param explosions: dict; root BOM name -> flattened tree, from get_bom_explosions
+	:param stock: dict; item_code -> actual qty in the selected warehouse
+	:return: dict; BOM name -> list of direct child rows with their orig_parts_can_build_qty
 	"""
-	sub_bom_list = [
-		item
-		for item in bom_data
-		if item.root_parent_index == root_parent_index
-		and item.indent == indent
-		and item.parent_bom == parent_bom
-	]
-	for item in sub_bom_list:
-		if not item.bom:
-			item["parts_can_build_qty"] = item.orig_parts_can_build_qty
-		else:
-			item["parts_can_build_qty"] = set_min_can_build(
-				item.root_parent_index, item.indent + 1, item.bom, bom_data
+	bom_dag = {}
+	for bom_no, explosion in explosions.items():
+		# BOMs already in the DAG were fully explored as part of an earlier tree
+		known = set(bom_dag)
+		seen = set()
+		bom_dag.setdefault(bom_no, [])
+		for row in explosion:
+			if row.parent_bom in known or (row.parent_bom, row.item) in seen:
+				continue
+			seen.add((row.parent_bom, row.item))
+			in_stock_qty = stock.get(row.item) or 0
+			bom_dag.setdefault(row.parent_bom, []).append(
+				frappe._dict(
+					bom=row.bom,
+					orig_parts_can_build_qty=int(in_stock_qty / row.qty_ratio) if row.qty_ratio else 0,
+				)
 			)
-	return min(item.parts_can_build_qty for item in sub_bom_list)
+	return bom_dag
+
+
+def get_parts_can_build(bom_dag):
+	"""
+	Computes the parts can build qty of every BOM in the DAG, the minimum of its direct children's,
+	in a post-order pass with an explicit stack. Each BOM is computed once and memoized.
+
+	:param bom_dag: dict; BOM name -> direct child rows, from get_bom_dag
+	:return: dict; BOM name -> parts can build qty, None for BOMs without children
+	"""
+	parts_can_build = {}
+
+	def child_can_build(child):
+		if child.bom and parts_can_build.get(child.bom) is not None:
+			return parts_can_build[child.bom]
+		return child.orig_parts_can_build_qty
+
+	for bom_no in bom_dag:
+		stack = [(bom_no, False)]
+		while stack:
+			node, visited = stack.pop()
+			if node in parts_can_build:
+				continue
+			children = bom_dag.get(node, [])
+			pending = [c.bom for c in children if c.bom and c.bom not in parts_can_build]
+			if not visited and pending:
+				stack.append((node, True))
+				stack.extend((bom, False) for bom in pending)
+				continue
+			parts_can_build[node] = (
+				min(child_can_build(child) for child in children) if children else None
+			)
+
+	return parts_can_build
+
+
+def set_min_can_build(bom_data, parts_can_build):
+	"""
+	Sets parts_can_build_qty and difference_qty for every row in a single pass
+
+	- BOM rows: parts_can_build_qty is the minimum of their direct children's parts_can_build_qty,
+	memoized per BOM; difference_qty is in_stock_qty + parts_can_build_qty - demanded_qty (parts
+	can build based off sub-assembly availability, NOT what's already in stock, so need to include
+	that separately)
+	- Raw materials rows: parts_can_build_qty is orig_parts_can_build_qty; difference_qty is
+	parts_can_build_qty - demanded_qty (parts can build based off what's in stock, so already
+	accounted for)
+
+	:param bom_data: list; report rows, mutated in place
+	:param parts_can_build: dict; BOM name -> parts can build qty, from get_parts_can_build
+	:return: None
+	"""
+	for row in bom_data:
+		if row.bom and parts_can_build.get(row.bom) is not None:
+			row.parts_can_build_qty = parts_can_build[row.bom]
+		else:
+			row.parts_can_build_qty = row.orig_parts_can_build_qty
+
+		if row.bom:
+			row.difference_qty = row.in_stock_qty + row.parts_can_build_qty - row.demanded_qty
+		else:
+			row.difference_qty = row.parts_can_build_qty - row.demanded_qty
+
+
+SNAPSHOT_FIELDS = ["demanded_qty", "in_stock_qty", "parts_can_build_qty", "difference_qty"]
+
+
+@frappe.whitelist()
+def compare_snapshots(from_snapshot, to_snapshot):
+	"""
+	Compares two completed Prepared Reports (snapshots) of Manufacturing Capacity row by row.
+	Rows are matched on their root BOM, parent BOM and item, and their order of appearance when a
+	sub-assembly is used more than once in a tree.
+
+	:param from_snapshot: str; name of the earlier Prepared Report
+	:param to_snapshot: str; name of the later Prepared Report
+	:return: list of dicts with the root BOM, parent BOM, BOM and item, the from and to values of
+	each of SNAPSHOT_FIELDS and their change, for rows that changed, were added or were removed
+	"""
+	if not frappe.get_doc("Report", "Manufacturing Capacity").is_permitted():
+		frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
+
+	from_rows = get_snapshot_rows(from_snapshot)
+	to_rows = get_snapshot_rows(to_snapshot)
+
+	changes = []
+	for key in list(from_rows) + [key for key in to_rows if key not in from_rows]:
+		from_row, to_row = from_rows.get(key, {}), to_rows.get(key, {})
+		root_bom, parent_bom, item, occurrence = key
+		change = frappe._dict(
+			{
+				"root_bom": root_bom,
+				"parent_bom": parent_bom,
+				"item": item,
+				"bom": to_row.get("bom") or from_row.get("bom"),
+				"status": "Removed" if not to_row else "Added" if not from_row else "Changed",
+			}
+		)
+		for fieldname in SNAPSHOT_FIELDS:
+			from_value = from_row.get(fieldname) or 0
+			to_value = to_row.get(fieldname) or 0
+			change[f"from_{fieldname}"] = from_value
+			change[f"to_{fieldname}"] = to_value
+			change[f"{fieldname}_change"] = to_value - from_value
+		changed = any(change[f"{fieldname}_change"] for fieldname in SNAPSHOT_FIELDS)
+		if from_row and to_row and not changed:
+			continue
+		changes.append(change)
+	return changes
+
+
+def get_snapshot_rows(snapshot):
+	"""
+	Loads the rows of a completed Manufacturing Capacity Prepared Report keyed by (root BOM,
+	parent BOM, item, occurrence), where occurrence counts rows repeated under the same root,
+	parent and item because a sub-assembly is used more than once in a tree
+
+	:param snapshot: str; Prepared Report name
+	:return: dict; key -> row
+	"""
+	prepared_report = frappe.get_doc("Prepared Report", snapshot)
+	report_name, status = prepared_report.report_name, prepared_report.status
+	if report_name != "Manufacturing Capacity" or status != "Completed":
+		frappe.throw(
+			frappe._("{0} is not a completed Manufacturing Capacity snapshot").format(snapshot)
+		)
+	prepared_report.check_permission()
+
+	result = get_prepared_report_result("Manufacturing Capacity", None, dn=snapshot).get("result")
+	rows, occurrences, root_bom = {}, {}, None
+	for row in result or []:
+		if not isinstance(row, dict):
+			continue
+		if not row.get("indent"):
+			root_bom = row.get("bom")
+		key = (root_bom, row.get("parent_bom") or "", row.get("item"))
+		occurrences[key] = occurrences.get(key, -1) + 1
+		rows[(*key, occurrences[key])] = row
+	return rows
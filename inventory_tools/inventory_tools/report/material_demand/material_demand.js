@@ -27,7 +27,21 @@ frappe.query_reports['Material Demand'] = {
 			fieldtype: 'Link',
 			options: 'Price List',
 		},
+		{
+			fieldname: 'lazy',
+			label: __('Load Suppliers On Expand'),
+			fieldtype: 'Check',
+		},
 	],
+	formatter(value, row, column, data, default_formatter) {
+		value = default_formatter(value, row, column, data)
+		if (data && column.fieldname == 'supplier' && data.indent == 0 && data.row_count && !data.loaded) {
+			value = `<button class="btn btn-xs btn-default material-demand-expand" data-supplier="${encodeURIComponent(
+				data.supplier
+			)}">+</button> ${value}`
+		}
+		return value
+	},
 	get_datatable_options(options) {
 		return Object.assign(options, {
 			treeView: true,
@@ -42,6 +56,12 @@ frappe.query_reports['Material Demand'] = {
 	},
 	onload: reportview => {
 		manage_buttons(reportview)
+		listen_for_creation(reportview)
+		reportview.page.wrapper.on('click', '.material-demand-expand', e => {
+			e.preventDefault()
+			e.stopPropagation()
+			load_supplier_rows(decodeURIComponent($(e.currentTarget).attr('data-supplier')))
+		})
 	},
 	refresh: reportview => {
 		manage_buttons(reportview)
@@ -73,11 +93,58 @@ function manage_buttons(reportview) {
 		'Create'
 	)
 
+	reportview.page.add_menu_item(__('Export Raw Data'), () => {
+		export_raw_data()
+	})
+
 	// these don't seem to be working
 	$(".btn-default:contains('Create Card')").addClass('hidden')
 	$(".btn-default:contains('Set Chart')").addClass('hidden')
 }
 
+function export_raw_data() {
+	frappe.prompt(
+		{
+			fieldtype: 'Select',
+			fieldname: 'file_format_type',
+			label: __('File Format'),
+			options: ['CSV', 'Excel'],
+			default: 'CSV',
+			reqd: 1,
+		},
+		async values => {
+			let file_url = await frappe.xcall(
+				'inventory_tools.inventory_tools.report.material_demand.material_demand.export',
+				{
+					filters: frappe.query_report.get_filter_values(),
+					file_format_type: values.file_format_type,
+				}
+			)
+			window.open(file_url)
+		},
+		__('Export Raw Data'),
+		__('Export')
+	)
+}
+
+async function load_supplier_rows(supplier) {
+	let rows = await frappe.xcall(
+		'inventory_tools.inventory_tools.report.material_demand.material_demand.get_supplier_rows',
+		{
+			filters: frappe.query_report.get_filter_values(),
+			supplier: supplier,
+		}
+	)
+	let data = frappe.query_report.data
+	let index = data.findIndex(row => row.indent == 0 && row.supplier == supplier && !row.loaded)
+	if (index < 0) {
+		return
+	}
+	data[index].loaded = 1
+	data.splice(index + 1, 0, ...rows)
+	frappe.query_report.datatable.refresh(data)
+}
+
 async function create(type) {
 	let values = frappe.query_report.get_filter_values()
 	let company = undefined
@@ -101,8 +168,10 @@ async function create(type) {
 	if (!selected_items.length) {
 		frappe.show_alert({ message: 'Please select one or more rows.', seconds: 5, indicator: 'red' })
 	} else {
+		// the server reports progress in selected item rows, including rows merged into one RFQ item
+		frappe.query_report.material_demand_total = selected_items.filter(row => row.item_code).length
 		await frappe
-			.xcall('inventory_tools.inventory_tools.report.material_demand.material_demand.create', {
+			.xcall('inventory_tools.inventory_tools.report.material_demand.material_demand.enqueue_create', {
 				company: company,
 				email_template: email_template || '',
 				filters: values,
@@ -113,6 +182,32 @@ async function create(type) {
 	}
 }
 
+function listen_for_creation(reportview) {
+	frappe.realtime.off('material_demand_progress')
+	frappe.realtime.on('material_demand_progress', data => {
+		frappe.show_progress(
+			__('Creating Documents'),
+			data.progress,
+			frappe.query_report.material_demand_total || data.progress,
+			__('Created {0} {1}', [__(data.doctype), data.name])
+		)
+	})
+	frappe.realtime.off('material_demand_create')
+	frappe.realtime.on('material_demand_create', data => {
+		frappe.hide_progress()
+		if (data.status == 'Failed') {
+			frappe.msgprint({
+				title: __('Document Creation Failed'),
+				message: __('{0} documents were created before the error', [data.documents.length]),
+				indicator: 'red',
+			})
+		} else {
+			frappe.show_alert({ message: data.message, seconds: 5, indicator: 'green' })
+		}
+		reportview.refresh()
+	})
+}
+
 function update_selection(row) {
 	if (row !== undefined && !row[5].content) {
 		const toggle = frappe.query_report.datatable.rowmanager.checkMap[row[0].rowIndex]
@@ -148,7 +243,7 @@ function update_selected_qty() {
 			}
 			frappe.query_report.datatable.cellmanager.updateCell(9, index, total_selected, true)
 			frappe.query_report.datatable.cellmanager.updateCell(12, index, selected_price, true)
-		} else {
+		} else if (supplier_row.indent) {
 			frappe.query_report.datatable.cellmanager.updateCell(9, index, '', true)
 			frappe.query_report.datatable.cellmanager.updateCell(12, index, '', true)
 		}
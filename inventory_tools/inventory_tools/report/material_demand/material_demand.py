@@ -1,7 +1,11 @@
 # Copyright (c) 2023, AgriTheory and contributors
 # For license information, please see license.txt
 
+import csv
+import hashlib
+import io
 import json
+from collections import Counter
 from itertools import groupby
 
 import frappe
@@ -9,8 +13,12 @@ from erpnext.stock.doctype.item.item import get_last_purchase_details
 from erpnext.stock.get_item_details import get_price_list_rate_for
 from frappe import _
 from frappe.query_builder import DocType
-from frappe.query_builder.functions import Coalesce
+from frappe.query_builder.functions import Count, Max, Sum
+from frappe.utils import get_files_path
 from frappe.utils.data import fmt_money, getdate
+from openpyxl import Workbook
+
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
 
 
 def execute(filters=None):
@@ -120,81 +128,363 @@ def get_columns(filters):
 			"align": "right",
 		},
 		{"fieldname": "currency", "fieldtype": "Link", "options": "Currency", "hidden": 1},
+		{
+			"label": "Rows",
+			"fieldname": "row_count",
+			"fieldtype": "Int",
+			"width": "70px",
+			"hidden": 0 if filters.lazy else 1,
+		},
 	]
 
 
 def get_data(filters):
+	if filters.lazy:
+		return get_supplier_summary(filters)
+
 	output = []
+	data = get_demand_rows(filters)
+	for supplier, _rows in groupby(data, lambda x: x.get("supplier")):
+		output.append({"supplier": supplier, "indent": 0})
+		output.extend(_rows)
+	return output
 
-	MaterialRequest = DocType("Material Request")
-	MaterialRequestItem = DocType("Material Request Item")
-	ItemSupplier = DocType("Item Supplier")
+
+def get_demand_query(filters):
+	"""
+	Builds the base Open Material Demand query shared by the full report, the lazy supplier
+	summary and the supplier child rows endpoint
+
+	:param filters: dict; report filters
+	:return: QueryBuilder; without any selected fields
+	"""
+	OpenMaterialDemand = DocType("Open Material Demand")
+	query = frappe.qb.from_(OpenMaterialDemand).where(
+		OpenMaterialDemand.schedule_date[
+			filters.start_date or "1900-01-01" : filters.en_date or "2100-12-31"
+		]
+	)
+
+	if filters.company:
+		query = query.where(OpenMaterialDemand.company == filters.company)
+		query = query.where(OpenMaterialDemand.supplier != filters.company)
+
+	return query
+
+
+def get_demand_rows(filters, supplier=None):
+	"""
+	Collects the indented Material Request Item rows of the report, optionally for a single
+	supplier
+
+	:param filters: dict; report filters
+	:param supplier: str; optional supplier (or "No Supplier") to limit the rows to
+	:return: list of dicts
+	"""
+	OpenMaterialDemand = DocType("Open Material Demand")
 	Company = DocType("Company")
+	TotalDemand = get_total_demand_query(filters).as_("total_demand")
 	query = (
-		frappe.qb.from_(MaterialRequest)
-		.join(MaterialRequestItem)
-		.on(MaterialRequest.name == MaterialRequestItem.parent)
-		.join(ItemSupplier)
-		.on(ItemSupplier.parent == MaterialRequestItem.item_code)
+		get_demand_query(filters)
 		.join(Company)
-		.on(MaterialRequest.company == Company.name)
+		.on(OpenMaterialDemand.company == Company.name)
+		.join(TotalDemand)
+		.on(TotalDemand.item_code == OpenMaterialDemand.item_code)
 		.select(
-			MaterialRequestItem.name.as_("material_request_item"),
-			MaterialRequest.name.as_("material_request"),
-			MaterialRequest.company,
-			MaterialRequest.schedule_date,
-			MaterialRequestItem.name.as_("mri"),
-			MaterialRequestItem.item_code,
-			MaterialRequestItem.item_name,
-			MaterialRequestItem.qty,
-			MaterialRequestItem.uom,
-			MaterialRequestItem.warehouse,
+			OpenMaterialDemand.material_request_item,
+			OpenMaterialDemand.material_request,
+			OpenMaterialDemand.company,
+			OpenMaterialDemand.schedule_date,
+			OpenMaterialDemand.material_request_item.as_("mri"),
+			OpenMaterialDemand.item_code,
+			OpenMaterialDemand.item_name,
+			OpenMaterialDemand.qty,
+			TotalDemand.total_demand,
+			OpenMaterialDemand.uom,
+			OpenMaterialDemand.warehouse,
 			Company.default_currency.as_("currency"),
-			MaterialRequestItem.rate.as_("supplier_price"),
-			Coalesce(ItemSupplier.supplier.as_("supplier"), "No Supplier").as_("supplier"),
-		)
-		.distinct()
-		.where(MaterialRequest.docstatus < 2)
-		.where(
-			MaterialRequest.schedule_date[
-				filters.start_date or "1900-01-01" : filters.en_date or "2100-12-31"
-			]
+			OpenMaterialDemand.rate.as_("supplier_price"),
+			OpenMaterialDemand.draft_po_qty.as_("draft_po"),
+			OpenMaterialDemand.supplier,
+			OpenMaterialDemand.requires_rfq,
 		)
-		.where(MaterialRequestItem.ordered_qty < MaterialRequestItem.stock_qty)
-		.where(MaterialRequestItem.received_qty < MaterialRequestItem.stock_qty)
-		.orderby(Coalesce(ItemSupplier.supplier, "No Supplier"), MaterialRequestItem.item_name)
+		.orderby(OpenMaterialDemand.supplier, OpenMaterialDemand.item_name)
 	)
 
-	if filters.company:
-		query = query.where(MaterialRequest.company == filters.company)
-		query = query.where(ItemSupplier.supplier != filters.company)
+	if supplier:
+		query = query.where(OpenMaterialDemand.supplier == supplier)
+
+	data = query.run(as_dict=1)
+	set_item_prices(filters, data)
+
+	for r in data:
+		r.supplier_price = fmt_money(r.get("supplier_price"), 2, r.get("currency")).replace(" ", "")
+		r.draft_po = f'<span style="color: red">{r.draft_po}</span>' if r.draft_po else None
+		r.indent = 1
+	return data
+
+
+def get_supplier_summary(filters):
+	"""
+	Collects one collapsed row per supplier with the number of open Material Request Items and
+	their total amount, without resolving prices or draft Purchase Orders
+
+	:param filters: dict; report filters
+	:return: list of dicts
+	"""
+	OpenMaterialDemand = DocType("Open Material Demand")
+	Company = DocType("Company")
+	query = (
+		get_demand_query(filters)
+		.join(Company)
+		.on(OpenMaterialDemand.company == Company.name)
+		.select(
+			OpenMaterialDemand.supplier,
+			Count(OpenMaterialDemand.material_request_item).distinct().as_("row_count"),
+			Sum(OpenMaterialDemand.amount).as_("amount"),
+			Max(Company.default_currency).as_("currency"),
+		)
+		.groupby(OpenMaterialDemand.supplier)
+		.orderby(OpenMaterialDemand.supplier)
+	)
 
 	data = query.run(as_dict=1)
-	total_demand = frappe._dict()
-	mris = []
+	for r in data:
+		r.amount = fmt_money(r.get("amount"), 2, r.get("currency")).replace(" ", "")
+		r.indent = 0
+	return data
+
+
+@frappe.whitelist()
+def get_supplier_rows(filters, supplier):
+	"""
+	Returns the child rows of a single supplier node when it is expanded in lazy mode
+
+	:param filters: dict | str; report filters
+	:param supplier: str; supplier (or "No Supplier") of the expanded node
+	:return: list of dicts
+	"""
+	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else frappe._dict(filters)
+	return get_demand_rows(filters, supplier)
+
+
+EXPORT_CHUNK_SIZE = 5000
+EXPORT_BLOCK_SIZE = 1024 * 1024
+
+EXPORT_COLUMNS = [
+	("Supplier", "supplier"),
+	("Material Request", "material_request"),
+	("Company", "company"),
+	("Required By", "schedule_date"),
+	("Item", "item_code"),
+	("Item Name", "item_name"),
+	("MR Qty", "qty"),
+	("Total Demand", "total_demand"),
+	("Draft POs", "draft_po"),
+	("UOM", "uom"),
+	("Price", "supplier_price"),
+	("Currency", "currency"),
+]
+
+
+@frappe.whitelist()
+def export(filters, file_format_type="CSV"):
+	"""
+	Exports the report as raw values, without supplier header rows, currency formatting or HTML
+	markup. Rows are read and written in chunks straight to a private File, so memory use
+	doesn't grow with the row count, and the file is downloaded from disk.
+
+	:param filters: dict | str; report filters
+	:param file_format_type: str; "CSV" or "Excel"
+	:return: str; file_url of the private File holding the export
+	"""
+	if not frappe.get_doc("Report", "Material Demand").is_permitted():
+		frappe.throw(frappe._("Not permitted"), frappe.PermissionError)
+
+	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else frappe._dict(filters)
+	labels = [label for label, fieldname in EXPORT_COLUMNS]
+	rows = (
+		[row.get(fieldname) for label, fieldname in EXPORT_COLUMNS] for row in get_export_rows(filters)
+	)
+
+	extension = "xlsx" if file_format_type == "Excel" else "csv"
+	file_name = f"material_demand_{frappe.generate_hash(length=10)}.{extension}"
+	file_path = get_files_path(file_name, is_private=1)
+	with open(file_path, "wb") as export_file:
+		if file_format_type == "Excel":
+			workbook = Workbook(write_only=True)
+			worksheet = workbook.create_sheet("Material Demand")
+			worksheet.append(labels)
+			for row in rows:
+				worksheet.append(row)
+			workbook.save(export_file)
+		else:
+			text_file = io.TextIOWrapper(export_file, encoding="utf-8", newline="")
+			writer = csv.writer(text_file)
+			writer.writerow(labels)
+			writer.writerows(rows)
+			text_file.flush()
+			text_file.detach()
+
+	# the content hash is computed in blocks so File doesn't read the whole export into memory
+	content_hash = hashlib.md5()
+	with open(file_path, "rb") as export_file:
+		for block in iter(lambda: export_file.read(EXPORT_BLOCK_SIZE), b""):
+			content_hash.update(block)
+
+	file = frappe.get_doc(
+		{
+			"doctype": "File",
+			"file_name": file_name,
+			"file_url": f"/private/files/{file_name}",
+			"is_private": 1,
+			"content_hash": content_hash.hexdigest(),
+		}
+	)
+	file.insert()
+	return file.file_url
+
+
+def get_export_rows(filters, chunk_size=EXPORT_CHUNK_SIZE):
+	"""
+	Yields the report's Material Request Item rows with raw numeric values, reading them in
+	chunks ordered by name. Each chunk starts after the last name of the previous one, so rows
+	inserted or removed while the export runs don't shift the pages. Total demand is loaded once
+	and prices are memoized across chunks.
+
+	:param filters: dict; report filters
+	:param chunk_size: int; number of rows to read per query
+	:return: generator of dicts
+	"""
+	OpenMaterialDemand = DocType("Open Material Demand")
+	Company = DocType("Company")
+	total_demand = {
+		row.item_code: row.total_demand for row in get_total_demand_query(filters).run(as_dict=True)
+	}
+	query = (
+		get_demand_query(filters)
+		.join(Company)
+		.on(OpenMaterialDemand.company == Company.name)
+		.select(
+			OpenMaterialDemand.name,
+			OpenMaterialDemand.supplier,
+			OpenMaterialDemand.material_request,
+			OpenMaterialDemand.company,
+			OpenMaterialDemand.schedule_date,
+			OpenMaterialDemand.item_code,
+			OpenMaterialDemand.item_name,
+			OpenMaterialDemand.qty,
+			OpenMaterialDemand.uom,
+			OpenMaterialDemand.draft_po_qty.as_("draft_po"),
+			Company.default_currency.as_("currency"),
+		)
+		.orderby(OpenMaterialDemand.name)
+		.limit(chunk_size)
+	)
+
+	prices = {}
+	last_name = ""
+	while True:
+		data = query.where(OpenMaterialDemand.name > last_name).run(as_dict=True)
+		if not data:
+			break
+		for row in data:
+			row.total_demand = total_demand.get(row.item_code)
+		set_item_prices(filters, data, prices)
+		yield from data
+		if len(data) < chunk_size:
+			break
+		last_name = data[-1].name
+
+
+def get_total_demand_query(filters):
+	"""
+	Builds a subquery of the total open Material Request qty per item, counting each Material
+	Request Item once regardless of how many Item Supplier rows the item has
+
+	:param filters: dict; report filters
+	:return: QueryBuilder; selects item_code and total_demand
+	"""
+	OpenMaterialDemand = DocType("Open Material Demand")
+	OpenDemand = (
+		get_demand_query(filters)
+		.select(
+			OpenMaterialDemand.material_request_item,
+			OpenMaterialDemand.item_code,
+			OpenMaterialDemand.qty,
+		)
+		.distinct()
+	).as_("open_demand")
+
+	return (
+		frappe.qb.from_(OpenDemand)
+		.select(OpenDemand.item_code, Sum(OpenDemand.qty).as_("total_demand"))
+		.groupby(OpenDemand.item_code)
+	)
+
+
+def set_item_prices(filters, data, prices=None):
+	"""
+	Resolves the supplier price for every row in data, computing each distinct (item, UOM,
+	supplier, price list, qty) combination only once per run. Items without any Item Price in the
+	selected price list are skipped without a lookup, and suppliers without a supplier-specific
+	Item Price share the general price list rate.
+
+	:param filters: dict; report filters
+	:param data: list of report rows; supplier_price is set in place
+	:param prices: dict; optional memo to share resolved prices across several calls in a run
+	:return: None
+	"""
+	prices = {} if prices is None else prices
+	price_list_suppliers = {}
+	if filters.price_list:
+		price_list_suppliers = get_price_list_suppliers(
+			filters.price_list, list({row.item_code for row in data})
+		)
+
 	for row in data:
-		if row.item_code not in total_demand and row.mri not in mris:
-			total_demand[row.item_code] = row.qty
-			mris.append(row.mri)
-		elif row.item_code in total_demand and row.mri not in mris:
-			total_demand[row.item_code] += row.qty
-			mris.append(row.mri)
+		if filters.price_list:
+			if row.item_code not in price_list_suppliers:
+				row.supplier_price = None
+				continue
+			supplier = row.supplier if row.supplier in price_list_suppliers[row.item_code] else None
+			key = (row.item_code, row.uom, supplier, filters.price_list, row.total_demand)
+		else:
+			key = (row.item_code,)
+
+		if key not in prices:
+			prices[key] = get_item_price(filters, row)
+		row.supplier_price = prices[key]
+
+
+def get_price_list_suppliers(price_list, item_codes):
+	"""
+	Collects the suppliers with a supplier-specific Item Price for each item in a price list in a
+	single query. Items with only a general Item Price map to an empty set; items without any Item
+	Price in the price list are absent.
+
+	:param price_list: str; Price List name
+	:param item_codes: list of Item names
+	:return: dict; item_code -> set of suppliers
+	"""
+	if not item_codes:
+		return {}
+
+	ItemPrice = DocType("Item Price")
+	item_prices = (
+		frappe.qb.from_(ItemPrice)
+		.select(ItemPrice.item_code, ItemPrice.supplier)
+		.distinct()
+		.where(ItemPrice.price_list == price_list)
+		.where(ItemPrice.item_code.isin(item_codes))
+	).run(as_dict=True)
 
-	for supplier, _rows in groupby(data, lambda x: x.get("supplier")):
-		rows = list(_rows)
-		output.append({"supplier": supplier, "indent": 0})
-		for r in rows:
-			r.total_demand = total_demand[r.item_code]
-			r.supplier_price = get_item_price(filters, r)
-			r.supplier_price = fmt_money(r.get("supplier_price"), 2, r.get("currency")).replace(" ", "")
-			r.draft_po = frappe.db.get_value(
-				"Purchase Order Item",
-				{"material_request_item": r.material_request_item, "docstatus": 0},
-				"sum(qty) as qty",
-			)
-			r.draft_po = f'<span style="color: red">{r.draft_po}</span>' if r.draft_po else None
-			output.append({**r, "indent": 1})
-	return output
+	price_list_suppliers = {}
+	for item_price in item_prices:
+		suppliers = price_list_suppliers.setdefault(item_price.item_code, set())
+		if item_price.supplier:
+			suppliers.add(item_price.supplier)
+	return price_list_suppliers
 
 
 def get_item_price(filters, r):
@@ -208,19 +498,137 @@ def get_item_price(filters, r):
 		return details.get("rate")
 
 
+@frappe.whitelist()
+def enqueue_create(company, email_template, filters, creation_type, rows):
+	"""
+	Queues document creation from the report on the long queue so large selections don't run
+	inside the web request. Progress and the final summary are published to the report page.
+	"""
+	frappe.enqueue(
+		"inventory_tools.inventory_tools.report.material_demand.material_demand.create",
+		queue="long",
+		timeout=3600,
+		job_name=f"Material Demand: {creation_type} for {company}",
+		company=company,
+		email_template=email_template,
+		filters=filters,
+		creation_type=creation_type,
+		rows=rows,
+	)
+	frappe.msgprint(frappe._("Document creation has been queued"), alert=True, indicator="blue")
+
+
 @frappe.whitelist()
 def create(company, email_template, filters, creation_type, rows):
-	if creation_type == "po":
-		message = create_pos(company, filters, rows)
-	elif creation_type == "rfq":
-		message = create_rfqs(company, email_template, filters, rows)
-	elif creation_type == "item_based":
-		message = create_item_based(company, email_template, filters, rows)
+	rows = [frappe._dict(r) for r in json.loads(rows)] if isinstance(rows, str) else rows
+	documents = []
+	try:
+		if creation_type == "po":
+			message = create_pos(company, filters, rows, documents)
+		elif creation_type == "rfq":
+			message = create_rfqs(company, email_template, filters, rows, documents)
+		elif creation_type == "item_based":
+			message = create_item_based(company, email_template, filters, rows, documents)
+	except Exception:
+		frappe.publish_realtime(
+			"material_demand_create",
+			{"status": "Failed", "documents": documents},
+			user=frappe.session.user,
+		)
+		raise
+
+	summary = {"status": "Completed", "message": message, "documents": documents}
+	frappe.publish_realtime("material_demand_create", summary, user=frappe.session.user)
 	frappe.msgprint(message, alert=True, indicator="green")
+	return summary
+
+
+def save_document(doc, documents=None, rows=None):
+	"""
+	Saves and commits a single document created from the report, so documents already created
+	are kept if a later one fails, and publishes the progress to the report page
+
+	:param doc: Purchase Order or Request for Quotation
+	:param documents: list; optional, collects the created documents for the summary
+	:param rows: int; number of selected report rows the document accounts for, defaults to its
+	number of items. Progress is reported in selected rows, like the total on the report page.
+	:return: None
+	"""
+	doc.save()
+	frappe.db.commit()
+	if documents is None:
+		return
+	documents.append(
+		{
+			"doctype": doc.doctype,
+			"name": doc.name,
+			"rows": len(doc.items) if rows is None else rows,
+		}
+	)
+	frappe.publish_realtime(
+		"material_demand_progress",
+		{
+			"doctype": doc.doctype,
+			"name": doc.name,
+			"progress": sum(d["rows"] for d in documents),
+		},
+		user=frappe.session.user,
+	)
+
+
+def get_material_request_items(material_request_items):
+	"""
+	Loads the Material Request Item fields needed to build documents from the report for all
+	selected rows in a single query
+
+	:param material_request_items: list of Material Request Item names
+	:return: dict; Material Request Item name -> row
+	"""
+	material_request_items = list({mri for mri in material_request_items if mri})
+	if not material_request_items:
+		return {}
+
+	MaterialRequest = DocType("Material Request")
+	MaterialRequestItem = DocType("Material Request Item")
+	data = (
+		frappe.qb.from_(MaterialRequestItem)
+		.join(MaterialRequest)
+		.on(MaterialRequest.name == MaterialRequestItem.parent)
+		.select(
+			MaterialRequestItem.name,
+			MaterialRequestItem.warehouse,
+			MaterialRequestItem.conversion_factor,
+			MaterialRequestItem.schedule_date,
+			MaterialRequest.company,
+		)
+		.where(MaterialRequestItem.name.isin(material_request_items))
+	).run(as_dict=True)
+	return {mri.name: mri for mri in data}
+
+
+def get_requires_rfq(rows):
+	"""
+	Loads the Item Supplier requires_rfq flag for every (item, supplier) pair in rows in a single
+	query, for rows that don't already carry it from the report
+
+	:param rows: list of report rows
+	:return: dict; (item_code, supplier) -> requires_rfq
+	"""
+	if not rows:
+		return {}
+
+	ItemSupplier = DocType("Item Supplier")
+	item_suppliers = (
+		frappe.qb.from_(ItemSupplier)
+		.select(ItemSupplier.parent, ItemSupplier.supplier, ItemSupplier.requires_rfq)
+		.where(ItemSupplier.parent.isin(list({row.item_code for row in rows})))
+		.where(ItemSupplier.supplier.isin(list({row.supplier for row in rows})))
+	).run(as_dict=True)
+	return {(i.parent, i.supplier): i.requires_rfq for i in item_suppliers}
 
 
 @frappe.whitelist()
-def create_item_based(company, email_template, filters, rows):
+def create_item_based(company, email_template, filters, rows, documents=None):
 	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else filters
 	rows = [frappe._dict(r) for r in json.loads(rows)] if isinstance(rows, str) else rows
 	if not rows:
@@ -231,43 +639,55 @@ def create_item_based(company, email_template, filters, rows):
 	rfqs_message = frappe._("0 Request For Quotation created")
 	po_message = frappe._("0 Purchase Orders created")
 
+	rows = [row for row in rows if row.get("item_code")]
+	requires_rfq = get_requires_rfq([row for row in rows if "requires_rfq" not in row])
+
 	for row in rows:
-		if not row.get("item_code"):
-			continue
-		if frappe.get_value(
-			"Item Supplier", {"parent": row["item_code"], "supplier": row["supplier"]}, "requires_rfq"
-		):
+		if "requires_rfq" not in row:
+			row.requires_rfq = requires_rfq.get((row.item_code, row.supplier))
+		if row.requires_rfq:
 			rfq_rows.append(row)
 		else:
 			po_rows.append(row)
 
 	if po_rows:
-		po_message = create_pos(company, filters, po_rows)
+		po_message = create_pos(company, filters, po_rows, documents)
 
 	if rfq_rows:
-		rfqs_message = create_rfqs(company, email_template, filters, rfq_rows)
+		rfqs_message = create_rfqs(company, email_template, filters, rfq_rows, documents)
 
 	return f"{po_message} {rfqs_message}"
 
 
 @frappe.whitelist()
-def create_rfqs(company, email_template, filters, rows):
+def create_rfqs(company, email_template, filters, rows, documents=None):
 	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else filters
 	rows = [frappe._dict(r) for r in json.loads(rows)] if isinstance(rows, str) else rows
 	if not rows:
 		return
 
-	items = frappe._dict({row.item_code: set() for row in rows if row.item_code})
+	items = frappe._dict()
+	item_rows = frappe._dict()
+	selected_rows = Counter()
 	for row in rows:
-		if row.item_code and row.supplier:
-			items[row.item_code].add(row.supplier)
+		if not row.item_code:
+			continue
+		suppliers = items.setdefault(row.item_code, set())
+		if row.supplier:
+			suppliers.add(row.supplier)
+		# only the first selected row of an item is added to its RFQ
+		item_rows.setdefault(row.item_code, row)
+		selected_rows[row.item_code] += 1
 
 	combos = frappe._dict({tuple(v): [] for k, v in items.items()})
 
 	for item_code, suppliers in items.items():
 		combos[tuple(suppliers)].append(item_code)
 
-	settings = frappe.get_doc("Inventory Tools Settings", company)
+	settings = get_inventory_tools_settings(company, throw=True)
+	material_request_items = get_material_request_items(
+		[row.material_request_item for row in item_rows.values()]
+	)
 
 	for suppliers, item_codes in combos.items():
 		if not item_codes:
@@ -281,42 +701,44 @@ def create_rfqs(company, email_template, filters, rows):
 			rfq.append("suppliers", {"supplier": supplier})
 
 		for item_code in item_codes:
-			for row in rows:
-				if row.item_code == item_code and item_code not in [r.item_code for r in rfq.items]:
-					rfq.append(
-						"items",
-						{
-							"item_code": row.get("item_code"),
-							"item_name": row.get("item_name"),
-							"required_date": max(getdate(), getdate(row.get("schedule_date"))),
-							"conversion_factor": frappe.get_value(
-								"Material Request Item", row.get("material_request_item"), "conversion_factor"
-							),
-							"qty": row.get("qty"),
-							"uom": row.get("uom"),
-							"material_request": row.get("material_request"),
-							"material_request_item": row.get("material_request_item"),
-							"warehouse": settings.aggregated_purchasing_warehouse
-							if settings.aggregated_purchasing_warehouse
-							else row.get("warehouse"),
-						},
-					)
+			row = item_rows[item_code]
+			mri = material_request_items.get(row.get("material_request_item")) or frappe._dict()
+			rfq.append(
+				"items",
+				{
+					"item_code": row.get("item_code"),
+					"item_name": row.get("item_name"),
+					"required_date": max(getdate(), getdate(row.get("schedule_date"))),
+					"conversion_factor": mri.conversion_factor,
+					"qty": row.get("qty"),
+					"uom": row.get("uom"),
+					"material_request": row.get("material_request"),
+					"material_request_item": row.get("material_request_item"),
+					"warehouse": settings.aggregated_purchasing_warehouse
+					if settings.aggregated_purchasing_warehouse
+					else row.get("warehouse"),
+				},
+			)
 		rfq.set_missing_values()
-		rfq.save()
+		save_document(rfq, documents, sum(selected_rows[item_code] for item_code in item_codes))
 
 	return frappe._(f"{len(combos.keys())} Request For Quotation created")
 
 
 @frappe.whitelist()
-def create_pos(company, filters, rows):
+def create_pos(company, filters, rows, documents=None):
 	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else filters
 	rows = [frappe._dict(r) for r in json.loads(rows)] if isinstance(rows, str) else rows
 	if not rows:
 		return
 	counter = 0
-	settings = frappe.get_doc("Inventory Tools Settings", company)
+	settings = get_inventory_tools_settings(company, throw=True)
 	requesting_companies = list({row.company for row in rows if row.company})
 
+	material_request_items = get_material_request_items(
+		[row.material_request_item for row in rows if row.get("item_code")]
+	)
+
 	if settings.purchase_order_aggregation_company == company:
 		requesting_companies = [company]
 	for requesting_company in requesting_companies:
@@ -344,7 +766,8 @@ def create_pos(company, filters, rows):
 					):
 						warehouse = settings.aggregated_purchasing_warehouse
 					else:
-						warehouse = frappe.get_value("Material Request Item", row.material_request_item, "warehouse")
+						mri = material_request_items.get(row.material_request_item) or frappe._dict()
+						warehouse = mri.warehouse
 					i = {
 						"item_code": row.get("item_code"),
 						"item_name": row.get("item_name"),
@@ -360,7 +783,7 @@ def create_pos(company, filters, rows):
 					}
 					po.append("items", i)
 
-			po.save()
+			save_document(po, documents)
 			counter += 1
 
 	return frappe._(f"{counter} Purchase Orders created")
@@ -21,6 +21,37 @@ frappe.query_reports['Quotation Demand'] = {
 			fieldtype: 'Date',
 			default: moment(),
 		},
+		{
+			fieldname: 'customer',
+			label: __('Customer'),
+			fieldtype: 'Link',
+			options: 'Customer',
+		},
+		{
+			fieldname: 'item_code',
+			label: __('Item'),
+			fieldtype: 'Link',
+			options: 'Item',
+		},
+		{
+			fieldname: 'item_group',
+			label: __('Item Group'),
+			fieldtype: 'Link',
+			options: 'Item Group',
+		},
+		{
+			fieldname: 'warehouse',
+			label: __('Warehouse'),
+			fieldtype: 'Link',
+			options: 'Warehouse',
+		},
+		{
+			fieldname: 'page',
+			label: __('Page'),
+			fieldtype: 'Int',
+			default: 1,
+			description: __('100 customers per page'),
+		},
 	],
 	on_report_render: reportview => {
 		reportview.datatable.options.columns[9].editable = true
@@ -43,6 +74,7 @@ frappe.query_reports['Quotation Demand'] = {
 	},
 	onload: reportview => {
 		manage_buttons(reportview)
+		listen_for_creation(reportview)
 	},
 	refresh: reportview => {
 		manage_buttons(reportview)
@@ -154,16 +186,51 @@ async function create() {
 	if (!selected_items.length) {
 		frappe.show_alert({ message: __('Please select one or more rows.'), seconds: 5, indicator: 'red' })
 	} else {
-		await frappe
-			.xcall('inventory_tools.inventory_tools.report.quotation_demand.quotation_demand.create', {
-				company: company,
-				filters: filters,
-				rows: selected_items,
-			})
-			.then(r => {})
+		enqueue_create({ company: company, filters: filters, rows: selected_items })
 	}
 }
 
+async function enqueue_create(args) {
+	let run_id = await frappe.xcall(
+		'inventory_tools.inventory_tools.report.quotation_demand.quotation_demand.enqueue_create',
+		args
+	)
+	frappe.query_report.quotation_demand_run = { ...args, run_id: run_id }
+}
+
+function listen_for_creation(reportview) {
+	frappe.realtime.off('quotation_demand_progress')
+	frappe.realtime.on('quotation_demand_progress', data => {
+		frappe.show_progress(
+			__('Creating Sales Orders'),
+			data.progress,
+			data.total,
+			data.status == 'Created'
+				? __('Created {0} for {1}', [data.sales_order, data.customer])
+				: __('{0}: {1}', [__(data.status), data.customer])
+		)
+	})
+	frappe.realtime.off('quotation_demand_create')
+	frappe.realtime.on('quotation_demand_create', data => {
+		frappe.hide_progress()
+		if (data.status == 'Failed') {
+			let customers = data.failed.map(f => frappe.utils.escape_html(f.customer)).join(', ')
+			frappe.confirm(
+				__('{0}. Sales Orders could not be created for: {1}. Retry these customers?', [data.message, customers]),
+				() => {
+					let run = frappe.query_report.quotation_demand_run
+					if (run && run.run_id == data.run_id) {
+						enqueue_create(run)
+					}
+				}
+			)
+		} else {
+			frappe.show_alert({ message: data.message, seconds: 5, indicator: 'green' })
+		}
+		reportview.refresh()
+	})
+}
+
 async function select_company() {
 	return new Promise(resolve => {
 		let dialog = new frappe.ui.Dialog({
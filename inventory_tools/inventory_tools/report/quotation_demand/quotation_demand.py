@@ -6,8 +6,14 @@ from itertools import groupby
 
 import frappe
 from frappe.query_builder import DocType
+from frappe.query_builder.functions import Sum
+from frappe.utils import cint
 from frappe.utils.data import fmt_money
 
+from inventory_tools.inventory_tools.settings import get_inventory_tools_settings
+
+CUSTOMERS_PER_PAGE = 100
+
 
 def execute(filters=None):
 	if (filters.start_date and filters.end_date) and (filters.start_date > filters.end_date):
@@ -18,10 +24,15 @@ def execute(filters=None):
 def get_data(filters):
 	Quotation = DocType("Quotation")
 	QuotationItem = DocType("Quotation Item")
+	DraftSalesOrders = get_draft_so_query().as_("draft_sales_orders")
+	customers = get_customers(filters)
+	if not customers:
+		return []
+
 	query = (
-		frappe.qb.from_(Quotation)
-		.inner_join(QuotationItem)
-		.on(Quotation.name == QuotationItem.parent)
+		get_quotation_query(filters)
+		.left_join(DraftSalesOrders)
+		.on(DraftSalesOrders.quotation_item == QuotationItem.name)
 		.select(
 			QuotationItem.name.as_("quotation_item"),
 			Quotation.name.as_("quotation"),
@@ -35,18 +46,12 @@ def get_data(filters):
 			QuotationItem.uom,
 			QuotationItem.warehouse,
 			QuotationItem.rate,
+			DraftSalesOrders.qty.as_("draft_so"),
 		)
-		.where(Quotation.docstatus < 2)
-		.where(Quotation.quotation_to == "Customer")
-		.where(
-			Quotation.transaction_date[filters.start_date or "1900-01-01" : filters.en_date or "2100-12-31"]
-		)
+		.where(Quotation.party_name.isin(customers))
 		.orderby(Quotation.party_name, Quotation.name, QuotationItem.item_name)
 	)
 
-	if filters.company:
-		query = query.where(Quotation.company == filters.company)
-
 	data = query.run(as_dict=1)
 
 	output = []
@@ -56,16 +61,92 @@ def get_data(filters):
 		for r in rows:
 			r.split_qty = r["qty"]
 			r.price = fmt_money(r.get("rate"), 2, r.get("currency")).replace(" ", "")
-			r.draft_so = frappe.db.get_value(
-				"Sales Order Item",
-				{"quotation_item": r.quotation_item, "docstatus": 0},
-				"sum(qty) as qty",
-			)
 			r.draft_so = f'<span style="color: red">{r.draft_so}</span>' if r.draft_so else None
 			output.append({**r, "indent": 1})
 	return output
 
 
+def get_quotation_query(filters):
+	"""
+	Builds the filtered Quotation / Quotation Item query shared by the customer page and the report
+	rows. The leading conditions match the (quotation_to, docstatus, transaction_date) index on
+	Quotation and the join matches the (parent, item_code) index on Quotation Item.
+
+	:param filters: dict; holds report inputs
+	:return: frappe.qb query without a select clause
+	"""
+	Quotation = DocType("Quotation")
+	QuotationItem = DocType("Quotation Item")
+	query = (
+		frappe.qb.from_(Quotation)
+		.inner_join(QuotationItem)
+		.on(Quotation.name == QuotationItem.parent)
+		.where(Quotation.quotation_to == "Customer")
+		.where(Quotation.docstatus < 2)
+		.where(
+			Quotation.transaction_date[filters.start_date or "1900-01-01" : filters.en_date or "2100-12-31"]
+		)
+	)
+
+	if filters.company:
+		query = query.where(Quotation.company == filters.company)
+	if filters.customer:
+		query = query.where(Quotation.party_name == filters.customer)
+	if filters.item_code:
+		query = query.where(QuotationItem.item_code == filters.item_code)
+	if filters.item_group:
+		# include the selected group's descendants in the Item Group tree
+		ItemGroup = DocType("Item Group")
+		lft, rgt = frappe.db.get_value("Item Group", filters.item_group, ["lft", "rgt"]) or (0, 0)
+		query = query.where(
+			QuotationItem.item_group.isin(
+				frappe.qb.from_(ItemGroup)
+				.select(ItemGroup.name)
+				.where((ItemGroup.lft >= lft) & (ItemGroup.rgt <= rgt))
+			)
+		)
+	if filters.warehouse:
+		query = query.where(QuotationItem.warehouse == filters.warehouse)
+	return query
+
+
+def get_customers(filters):
+	"""
+	Returns the customers on the requested page of the report, in report order, so paging never
+	splits a customer's quotation items across pages
+
+	:param filters: dict; holds report inputs, page is 1-based
+	:return: list of Customer names
+	"""
+	Quotation = DocType("Quotation")
+	page = max(cint(filters.page), 1)
+	return (
+		get_quotation_query(filters)
+		.select(Quotation.party_name)
+		.distinct()
+		.orderby(Quotation.party_name)
+		.limit(CUSTOMERS_PER_PAGE)
+		.offset((page - 1) * CUSTOMERS_PER_PAGE)
+	).run(pluck=True)
+
+
+def get_draft_so_query():
+	"""
+	Aggregates the quantity on draft Sales Orders for every Quotation Item in one grouped query,
+	to be joined into the report query
+
+	:return: frappe.qb query of quotation_item, qty
+	"""
+	SalesOrderItem = DocType("Sales Order Item")
+	return (
+		frappe.qb.from_(SalesOrderItem)
+		.select(SalesOrderItem.quotation_item, Sum(SalesOrderItem.qty).as_("qty"))
+		.where(SalesOrderItem.docstatus == 0)
+		.where(SalesOrderItem.quotation_item.isnotnull())
+		.groupby(SalesOrderItem.quotation_item)
+	)
+
+
 def get_columns():
 	hide_company = True if len(frappe.get_all("Company")) == 1 else False
 	return [
@@ -156,59 +237,192 @@ def get_columns():
 	]
 
 
+CREATE_RUN_CACHE_KEY = "inventory_tools_quotation_demand_create"
+CREATE_RUN_TTL = 86400
+
+
 @frappe.whitelist()
-def create(company, filters, rows):
+def enqueue_create(company, filters, rows, run_id=None):
+	"""
+	Queues Sales Order creation from the report on the long queue. Passing the run_id of an
+	earlier run retries it: customers whose Sales Order was already created in that run are
+	skipped.
+
+	:return: str; run_id
+	"""
+	run_id = run_id or frappe.generate_hash(length=10)
+	frappe.enqueue(
+		"inventory_tools.inventory_tools.report.quotation_demand.quotation_demand.create",
+		queue="long",
+		timeout=3600,
+		job_name=f"Quotation Demand: Sales Orders for {company}",
+		company=company,
+		filters=filters,
+		rows=rows,
+		run_id=run_id,
+	)
+	frappe.msgprint(frappe._("Sales Order creation has been queued"), alert=True, indicator="blue")
+	return run_id
+
+
+@frappe.whitelist()
+def create(company, filters, rows, run_id=None):
 	filters = frappe._dict(json.loads(filters)) if isinstance(filters, str) else filters
 	rows = [frappe._dict(r) for r in json.loads(rows)] if isinstance(rows, str) else rows
 	if not rows:
 		return
-	counter = 0
-	settings = frappe.get_doc("Inventory Tools Settings", company)
+	settings = get_inventory_tools_settings(company, throw=True)
 	requesting_companies = list({row.company for row in rows})
 	if settings.sales_order_aggregation_company == company:
 		requesting_companies = [company]
 
-	for requesting_company in requesting_companies:
-		for customer, _rows in groupby(rows, lambda x: x.get("customer")):
-			rows = list(_rows)
-			so = frappe.new_doc("Sales Order")
-			so.transaction_date = rows[0].get("transaction_date")
-			so.customer = customer
-			if settings.sales_order_aggregation_company and len(requesting_companies) == 1:
-				so.multi_company_sales_order = True
-				so.company = settings.sales_order_aggregation_company
-			else:
-				so.company = requesting_company
-			for row in rows:
-				if not row.get("item_code"):
-					continue
-
-				if settings.sales_order_aggregation_company == so.company or so.company == row.company:
-					if (
-						settings.sales_order_aggregation_company == so.company
-						and settings.aggregated_sales_warehouse
-					):
-						warehouse = settings.aggregated_sales_warehouse
-					else:
-						warehouse = frappe.get_value("Quotation Item", row.quotation_item, "warehouse")
-
-					so.append(
-						"items",
-						{
-							"item_code": row.get("item_code"),
-							"item_name": row.get("item_name"),
-							"delivery_date": row.get("transaction_date"),
-							"uom": row.get("uom"),
-							"qty": row.get("split_qty"),
-							"rate": row.get("rate"),
-							"warehouse": warehouse,
-							"quotation_item": row.get("quotation_item"),
-							"prevdoc_docname": row.get("quotation"),
-						},
-					)
-
-			if so.items:
+	warehouses = get_quotation_item_warehouses([row.quotation_item for row in rows])
+	completed = get_completed_customers(run_id)
+	# one Sales Order per customer, even if their rows aren't next to each other in the selection
+	rows_by_customer = {}
+	for row in rows:
+		rows_by_customer.setdefault(row.get("customer"), []).append(row)
+	customers = [
+		(requesting_company, customer, customer_rows)
+		for requesting_company in requesting_companies
+		for customer, customer_rows in rows_by_customer.items()
+	]
+
+	sales_orders, failed = [], []
+	for index, (requesting_company, customer, customer_rows) in enumerate(customers, 1):
+		key = f"{requesting_company}::{customer}"
+		status = "Skipped"
+		so = None
+		if key not in completed:
+			so = get_sales_order(
+				settings, requesting_companies, requesting_company, customer, customer_rows, warehouses
+			)
+		if so and so.items:
+			try:
 				so.save()
-				counter += 1
+				frappe.db.commit()
+			except Exception:
+				frappe.db.rollback()
+				frappe.log_error(title=frappe._("Quotation Demand: Sales Order for {0}").format(customer))
+				failed.append({"company": requesting_company, "customer": customer})
+				status = "Failed"
+			else:
+				sales_orders.append(so.name)
+				if run_id:
+					completed.append(key)
+					set_completed_customers(run_id, completed)
+				status = "Created"
+
+		frappe.publish_realtime(
+			"quotation_demand_progress",
+			{
+				"customer": customer,
+				"sales_order": so.name if status == "Created" else None,
+				"status": status,
+				"progress": index,
+				"total": len(customers),
+			},
+			user=frappe.session.user,
+		)
 
-	frappe.msgprint(frappe._(f"{counter} Sales Orders created"), alert=True, indicator="green")
+	message = frappe._("{0} Sales Orders created").format(len(sales_orders))
+	summary = {
+		"status": "Failed" if failed else "Completed",
+		"message": message,
+		"run_id": run_id,
+		"sales_orders": sales_orders,
+		"failed": failed,
+	}
+	frappe.publish_realtime("quotation_demand_create", summary, user=frappe.session.user)
+	frappe.msgprint(message, alert=True, indicator="red" if failed else "green")
+	return summary
+
+
+def get_sales_order(settings, requesting_companies, requesting_company, customer, rows, warehouses):
+	"""
+	Builds (without saving) the Sales Order for one customer and requesting company
+
+	:param settings: Inventory Tools Settings of the creating company
+	:param requesting_companies: list of the companies Sales Orders are created for
+	:param requesting_company: str
+	:param customer: str
+	:param rows: list of the customer's selected report rows
+	:param warehouses: dict; Quotation Item name -> warehouse, from get_quotation_item_warehouses
+	:return: Sales Order
+	"""
+	so = frappe.new_doc("Sales Order")
+	so.transaction_date = rows[0].get("transaction_date")
+	so.customer = customer
+	if settings.sales_order_aggregation_company and len(requesting_companies) == 1:
+		so.multi_company_sales_order = True
+		so.company = settings.sales_order_aggregation_company
+	else:
+		so.company = requesting_company
+	for row in rows:
+		if not row.get("item_code"):
+			continue
+
+		if settings.sales_order_aggregation_company == so.company or so.company == row.company:
+			if (
+				settings.sales_order_aggregation_company == so.company
+				and settings.aggregated_sales_warehouse
+			):
+				warehouse = settings.aggregated_sales_warehouse
+			else:
+				warehouse = warehouses.get(row.quotation_item)
+
+			so.append(
+				"items",
+				{
+					"item_code": row.get("item_code"),
+					"item_name": row.get("item_name"),
+					"delivery_date": row.get("transaction_date"),
+					"uom": row.get("uom"),
+					"qty": row.get("split_qty"),
+					"rate": row.get("rate"),
+					"warehouse": warehouse,
+					"quotation_item": row.get("quotation_item"),
+					"prevdoc_docname": row.get("quotation"),
+				},
+			)
+	return so
+
+
+def get_quotation_item_warehouses(quotation_items):
+	"""
+	Loads the warehouse of every selected Quotation Item in a single query
+
+	:param quotation_items: list of Quotation Item names
+	:return: dict; Quotation Item name -> warehouse
+	"""
+	quotation_items = list({qi for qi in quotation_items if qi})
+	if not quotation_items:
+		return {}
+
+	QuotationItem = DocType("Quotation Item")
+	data = (
+		frappe.qb.from_(QuotationItem)
+		.select(QuotationItem.name, QuotationItem.warehouse)
+		.where(QuotationItem.name.isin(quotation_items))
+	).run(as_dict=True)
+	return {qi.name: qi.warehouse for qi in data}
+
+
+def get_completed_customers(run_id):
+	"""
+	Returns the "company::customer" keys whose Sales Order was already created in a run
+
+	:param run_id: str; None for a run that can't be retried
+	:return: list
+	"""
+	if not run_id:
+		return []
+	return frappe.cache().get_value(f"{CREATE_RUN_CACHE_KEY}::{run_id}") or []
+
+
+def set_completed_customers(run_id, completed):
+	if not run_id:
+		return
+	frappe.cache().set_value(
+		f"{CREATE_RUN_CACHE_KEY}::{run_id}", completed, expires_in_sec=CREATE_RUN_TTL
+	)
@@ -0,0 +1,55 @@
+# Copyright (c) 2026, AgriTheory and contributors
+# For license information, please see license.txt
+
+import frappe
+
+SETTINGS_CACHE_KEY = "inventory_tools_settings"
+
+
+def get_inventory_tools_settings(company, throw=False):
+	"""
+	Returns a company's Inventory Tools Settings as a read-only frappe._dict, cached on frappe.local
+	for the rest of the request and in Redis across requests. The cache is cleared when the
+	settings are updated or deleted.
+
+	:param company: str; Company name
+	:param throw: bool; raise DoesNotExistError instead of returning None if there are no settings
+	:return: frappe._dict of the settings fields, or None if the company has no settings
+	"""
+	settings = None
+	if company:
+		if not hasattr(frappe.local, "inventory_tools_settings"):
+			frappe.local.inventory_tools_settings = {}
+		if company not in frappe.local.inventory_tools_settings:
+			frappe.local.inventory_tools_settings[company] = frappe.cache().hget(
+				SETTINGS_CACHE_KEY, company, generator=lambda: load_inventory_tools_settings(company)
+			)
+		settings = frappe.local.inventory_tools_settings[company]
+
+	if settings is None and throw:
+		frappe.throw(
+			frappe._("Please create Inventory Tools Settings for Company {0}").format(company),
+			frappe.DoesNotExistError,
+		)
+	return settings
+
+
+def load_inventory_tools_settings(company):
+	if not frappe.db.exists("Inventory Tools Settings", company):
+		return None
+	return frappe.get_doc("Inventory Tools Settings", company).as_dict()
+
+
+def clear_inventory_tools_settings_cache(company=None):
+	"""
+	Clears the cached settings of a company, or of every company if none is given
+
+	:param company: str; Company name
+	:return: None
+	"""
+	if company:
+		frappe.cache().hdel(SETTINGS_CACHE_KEY, company)
+		getattr(frappe.local, "inventory_tools_settings", {}).pop(company, None)
+	else:
+		frappe.cache().delete_key(SETTINGS_CACHE_KEY)
+		frappe.local.inventory_tools_settings = {}
@@ -0,0 +1,6 @@
+import frappe
+
+
+def execute():
+	frappe.db.add_index("Quotation", ["quotation_to", "docstatus", "transaction_date"])
+	frappe.db.add_index("Quotation Item", ["parent", "item_code"])
@@ -0,0 +1,10 @@
+import frappe
+
+from inventory_tools.inventory_tools.doctype.flat_bom_explosion.flat_bom_explosion import (
+	rebuild_flat_bom_explosion,
+)
+
+
+def execute():
+	frappe.reload_doc("inventory_tools", "doctype", "flat_bom_explosion", force=True)
+	rebuild_flat_bom_explosion()
@@ -0,0 +1,10 @@
+import frappe
+
+from inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand import (
+	rebuild_open_material_demand,
+)
+
+
+def execute():
+	frappe.reload_doc("inventory_tools", "doctype", "open_material_demand", force=True)
+	rebuild_open_material_demand()
@@ -4,6 +4,7 @@ import frappe
 import pytest
 
 from inventory_tools.inventory_tools.overrides.purchase_order import (
+	get_items_details,
 	make_purchase_invoices,
 	make_purchase_receipts,
 )
@@ -56,3 +57,40 @@ def test_purchase_invoice_aggregation():
 			assert mr_company == pi.company
 			assert po.company == settings.purchase_order_aggregation_company
 			# NOTE: PO company MAY BE different from MR and PI
+
+
+@pytest.mark.order(27)
+def test_batched_item_details():
+	po = frappe.get_last_doc("Purchase Order")
+	args_list = [
+		{
+			"item_code": row.item_code,
+			"company": po.company,
+			"doctype": po.doctype,
+			"name": po.name,
+			"supplier": po.supplier,
+			"currency": po.currency,
+			"conversion_rate": po.conversion_rate,
+			"buying_price_list": po.buying_price_list,
+			"transaction_date": po.transaction_date,
+			"warehouse": row.warehouse,
+			"qty": row.qty,
+		}
+		for row in po.items
+	]
+	args_list.append({"item_code": None, "company": po.company, "doctype": po.doctype})
+	details = get_items_details(frappe.as_json(args_list), po.as_json())
+	assert len(details) == len(args_list)
+	assert not details[-1]  # blank rows are skipped
+	assert [row.item_code for row in details[:-1]] == [row.item_code for row in po.items]
+	assert [row.stock_uom for row in details[:-1]] == [row.stock_uom for row in po.items]
+	assert not frappe.flags.item_details_validated
+
+	item_code = po.items[0].item_code
+	for fieldname in ("has_variants", "disabled"):
+		frappe.db.set_value("Item", item_code, fieldname, 1)
+		try:
+			with pytest.raises(frappe.ValidationError):
+				get_items_details(frappe.as_json(args_list), po.as_json())
+		finally:
+			frappe.db.set_value("Item", item_code, fieldname, 0)
@@ -5,10 +5,39 @@ from erpnext.manufacturing.doctype.work_order.work_order import (
 	make_stock_entry,
 	make_work_order,
 )
+from frappe.core.doctype.prepared_report.prepared_report import run_background
 from frappe.exceptions import ValidationError
 from frappe.utils import getdate
 
+from inventory_tools.inventory_tools.doctype.flat_bom_explosion.flat_bom_explosion import (
+	get_where_used,
+)
+from inventory_tools.inventory_tools.overrides.bom import (
+	BOM_EXPLOSION_CACHE_KEY,
+	BOM_EXPLOSION_TTL,
+	clear_bom_explosion_cache,
+	explode_boms,
+	flatten_bom,
+	get_bom_explosions,
+	get_cache_field,
+	get_flat_bom_explosions,
+)
+from inventory_tools.inventory_tools.overrides.warehouse import (
+	WAREHOUSE_STOCK_CACHE_KEY,
+	get_warehouse_stock,
+)
+from inventory_tools.inventory_tools.report.manufacturing_capacity.capacity_simulation import (
+	get_bom_children,
+	get_build_order,
+	get_raw_requirements,
+	simulate_capacity,
+)
 from inventory_tools.inventory_tools.report.manufacturing_capacity.manufacturing_capacity import (
+	compare_snapshots,
+	execute,
+	get_bom_parents,
+	get_demand,
+	get_snapshot_rows,
 	get_total_demand,
 )
 
@@ -104,3 +133,215 @@ def test_total_demand():
 	assert _mr.status == "Stopped"
 	assert 15 == get_total_demand(pocketful_bom_no)  # test data of 10 + SO of 5
 	assert 30 == get_total_demand(tower_bom_no)  # test data of 20 + SO of 10
+
+
+@pytest.mark.order(11)
+def test_bom_parents():
+	def default_bom(item):
+		return frappe.get_value("BOM", {"item": item, "is_active": 1, "is_default": 1})
+
+	parent_set = set()
+	get_bom_parents(default_bom("Bayberry Popper"), parent_set)
+	assert parent_set == {default_bom("Pocketful of Bay"), default_bom("Tower of Bay-bel")}
+
+	parent_set = set()
+	get_bom_parents(default_bom("Tower of Bay-bel"), parent_set)
+	assert parent_set == {default_bom("Tower of Bay-bel")}
+
+
+@pytest.mark.order(12)
+def test_demand_for_multiple_items():
+	items = ["Pocketful of Bay", "Tower of Bay-bel", "Bayberry"]
+	demand = get_demand(items)
+	assert "Bayberry" not in demand
+	for item in items[:2]:
+		bom_no = frappe.get_value("BOM", {"item": item, "is_active": 1, "is_default": 1})
+		assert demand[item] == get_total_demand(bom_no)
+
+
+@pytest.mark.order(13)
+def test_bom_explosion_cache():
+	bom_no = frappe.get_value("BOM", {"item": "Pocketful of Bay", "is_active": 1, "is_default": 1})
+	bom = frappe.get_doc("BOM", bom_no)
+	cache_field = get_cache_field(bom_no, bom.modified)
+
+	clear_bom_explosion_cache(bom)
+	assert frappe.cache().hget(BOM_EXPLOSION_CACHE_KEY, cache_field) is None
+
+	explosion = get_bom_explosions([bom_no])[bom_no]
+	assert frappe.cache().hget(BOM_EXPLOSION_CACHE_KEY, cache_field) is not None
+	direct_children = [row for row in explosion if row.indent == 1]
+	assert {row.item for row in direct_children} == {row.item_code for row in bom.items}
+	assert all(row.parent_bom == bom_no for row in direct_children)
+	assert get_bom_explosions([bom_no])[bom_no] == explosion
+	ttl = frappe.cache().ttl(frappe.cache().make_key(BOM_EXPLOSION_CACHE_KEY))
+	assert 0 < ttl <= BOM_EXPLOSION_TTL
+
+	clear_bom_explosion_cache(bom)
+	assert frappe.cache().hget(BOM_EXPLOSION_CACHE_KEY, cache_field) is None
+
+
+@pytest.mark.order(14)
+def test_simulate_capacity():
+	pocketful_bom_no = frappe.get_value(
+		"BOM", {"item": "Pocketful of Bay", "is_active": 1, "is_default": 1}
+	)
+	tower_bom_no = frappe.get_value(
+		"BOM", {"item": "Tower of Bay-bel", "is_active": 1, "is_default": 1}
+	)
+	scenarios = [
+		{pocketful_bom_no: 0, tower_bom_no: 0},
+		{pocketful_bom_no: 1000000, tower_bom_no: 1000000},
+	]
+	no_demand, large_demand = simulate_capacity(scenarios, "Storeroom - APC")
+
+	assert no_demand.fill_rate == 1
+	assert no_demand.shortages == []
+	assert no_demand.buildable_qty == {pocketful_bom_no: 0, tower_bom_no: 0}
+
+	assert large_demand.fill_rate < 1
+	assert large_demand.shortages
+	for shortage in large_demand.shortages:
+		assert shortage["shortage_qty"] == shortage["required_qty"] - shortage["available_qty"]
+	for bom_no, buildable_qty in large_demand.buildable_qty.items():
+		assert buildable_qty == int(1000000 * large_demand.fill_rate)
+
+	# sub-assemblies in stock are used before their own components
+	bom_children = get_bom_children([tower_bom_no])
+	build_order = get_build_order(bom_children)
+	sub_assembly = next(child for child in bom_children[tower_bom_no] if child.bom)
+	demand = {tower_bom_no: 10}
+	without_stock = get_raw_requirements(bom_children, build_order, demand, {})
+	required_qty = 10 * sub_assembly.qty_ratio
+	with_stock = get_raw_requirements(
+		bom_children, build_order, demand, {sub_assembly.item: required_qty}
+	)
+	sub_assembly_requirements = get_raw_requirements(
+		bom_children, build_order, {sub_assembly.bom: required_qty}, {}
+	)
+	for item_code, qty in without_stock.items():
+		expected_qty = qty - sub_assembly_requirements.get(item_code, 0)
+		assert with_stock.get(item_code, 0) == pytest.approx(expected_qty)
+
+	with pytest.raises(frappe.DoesNotExistError):
+		simulate_capacity([{"BOM-Not-A-BOM-001": 1}], "Storeroom - APC")
+
+
+@pytest.mark.order(15)
+def test_warehouse_stock_rollup():
+	warehouse = frappe.get_value("Warehouse", {"company": "Ambrosia Pie Company", "is_group": 1})
+	frappe.cache().delete_value(f"{WAREHOUSE_STOCK_CACHE_KEY}::{warehouse}")
+	lft, rgt = frappe.get_value("Warehouse", warehouse, ["lft", "rgt"])
+	warehouses = frappe.get_all("Warehouse", {"lft": [">=", lft], "rgt": ["<=", rgt]}, pluck="name")
+
+	expected = {}
+	for row in frappe.get_all(
+		"Bin", {"warehouse": ["in", warehouses]}, ["item_code", "actual_qty", "projected_qty"]
+	):
+		qty = expected.setdefault(row.item_code, [0, 0])
+		qty[0] += row.actual_qty
+		qty[1] += row.projected_qty
+
+	stock = get_warehouse_stock(warehouse)
+	assert stock.keys() == expected.keys()
+	for item_code, (actual_qty, projected_qty) in expected.items():
+		assert stock[item_code]["actual_qty"] == actual_qty
+		assert stock[item_code]["projected_qty"] == projected_qty
+	assert frappe.cache().get_value(f"{WAREHOUSE_STOCK_CACHE_KEY}::{warehouse}") == stock
+
+
+@pytest.mark.order(16)
+def test_report_multiple_boms():
+	popper_bom_no = frappe.get_value(
+		"BOM", {"item": "Bayberry Popper", "is_active": 1, "is_default": 1}
+	)
+	tower_bom_no = frappe.get_value(
+		"BOM", {"item": "Tower of Bay-bel", "is_active": 1, "is_default": 1}
+	)
+	warehouse = frappe.get_value("Warehouse", {"company": "Ambrosia Pie Company", "is_group": 1})
+
+	_, single = execute(frappe._dict({"bom": popper_bom_no, "warehouse": warehouse}))
+	_, multiple = execute(
+		frappe._dict({"bom": [popper_bom_no, tower_bom_no], "warehouse": warehouse})
+	)
+
+	# Tower of Bay-bel is already a root of Bayberry Popper, so selecting both adds no rows
+	assert len(single) == len(multiple)
+	assert {row.bom for row in multiple if row.is_selected_bom} == {popper_bom_no, tower_bom_no}
+
+	# every occurrence of the shared sub-assembly has the same parts can build qty
+	popper_rows = [row for row in multiple if row.bom == popper_bom_no]
+	assert len(popper_rows) > 1
+	assert len({row.parts_can_build_qty for row in popper_rows}) == 1
+
+
+@pytest.mark.order(17)
+def test_flat_bom_explosion():
+	def default_bom(item):
+		return frappe.get_value("BOM", {"item": item, "is_active": 1, "is_default": 1})
+
+	# backfill the table through the patch entry, as bench migrate does
+	patch = "inventory_tools.patches.rebuild_flat_bom_explosion"
+	patches = frappe.get_app_path("inventory_tools", "patches.txt")
+	with open(patches) as f:
+		assert patch in [line.split("#")[0].strip() for line in f]
+	frappe.get_attr(f"{patch}.execute")()
+	tower_bom_no = default_bom("Tower of Bay-bel")
+	flat_explosion = get_flat_bom_explosions([tower_bom_no])[tower_bom_no]
+	explosion = flatten_bom(tower_bom_no, explode_boms([tower_bom_no]))
+	assert [(row.item, row.bom, row.indent) for row in flat_explosion] == [
+		(row.item, row.bom, row.indent) for row in explosion
+	]
+	for flat_row, row in zip(flat_explosion, explosion):
+		assert flat_row.stock_qty == pytest.approx(row.stock_qty)
+		assert flat_row.path == row.path
+
+	popper_item = "Bayberry Popper"
+	where_used = get_where_used(popper_item)
+	assert {default_bom("Pocketful of Bay"), tower_bom_no} <= {row.root_bom for row in where_used}
+	for row in where_used:
+		expected_qty = sum(
+			r.stock_qty
+			for r in flatten_bom(row.root_bom, explode_boms([row.root_bom]))
+			if r.item == popper_item
+		)
+		assert row.stock_qty == pytest.approx(expected_qty)
+
+
+@pytest.mark.order(28)
+def test_compare_snapshots():
+	tower_bom_no = frappe.get_value(
+		"BOM", {"item": "Tower of Bay-bel", "is_active": 1, "is_default": 1}
+	)
+	pocketful_bom_no = frappe.get_value(
+		"BOM", {"item": "Pocketful of Bay", "is_active": 1, "is_default": 1}
+	)
+	warehouse = frappe.get_value("Warehouse", {"company": "Ambrosia Pie Company", "is_group": 1})
+
+	def take_snapshot(bom_no):
+		prepared_report = frappe.get_doc(
+			{
+				"doctype": "Prepared Report",
+				"report_name": "Manufacturing Capacity",
+				"ref_report_doctype": "Manufacturing Capacity",
+				"filters": frappe.as_json({"bom": [bom_no], "warehouse": warehouse}),
+			}
+		).insert()
+		run_background(prepared_report.name)
+		return prepared_report.name
+
+	tower_snapshot = take_snapshot(tower_bom_no)
+	tower_rows = get_snapshot_rows(tower_snapshot)
+	_, rows = execute(frappe._dict({"bom": [tower_bom_no], "warehouse": warehouse}))
+	assert len(tower_rows) == len(rows)
+	assert compare_snapshots(tower_snapshot, take_snapshot(tower_bom_no)) == []
+
+	pocketful_snapshot = take_snapshot(pocketful_bom_no)
+	pocketful_rows = get_snapshot_rows(pocketful_snapshot)
+	changes = compare_snapshots(tower_snapshot, pocketful_snapshot)
+	assert len([c for c in changes if c.status == "Removed"]) == len(tower_rows)
+	assert len([c for c in changes if c.status == "Added"]) == len(pocketful_rows)
+	for change in changes:
+		if change.status == "Added":
+			assert change.from_demanded_qty == 0
+			assert change.demanded_qty_change == change.to_demanded_qty
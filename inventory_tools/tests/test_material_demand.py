@@ -2,9 +2,180 @@ import frappe
 import pytest
 from frappe.utils import flt, getdate
 
+from inventory_tools.inventory_tools.doctype.open_material_demand.open_material_demand import (
+	rebuild_open_material_demand,
+)
+from inventory_tools.inventory_tools.report.material_demand.material_demand import (
+	create,
+	enqueue_create,
+)
 from inventory_tools.inventory_tools.report.material_demand.material_demand import (
 	execute as execute_material_demand,
 )
+from inventory_tools.inventory_tools.report.material_demand.material_demand import (
+	export,
+	get_export_rows,
+	get_supplier_rows,
+)
+
+
+@pytest.mark.order(18)
+def test_open_material_demand_matches_rebuild():
+	fields = ["material_request_item", "supplier", "qty", "open_qty", "draft_po_qty"]
+	order_by = "material_request_item, supplier"
+	incremental = frappe.get_all("Open Material Demand", fields=fields, order_by=order_by)
+	assert incremental
+
+	rebuild_open_material_demand()
+	assert frappe.get_all("Open Material Demand", fields=fields, order_by=order_by) == incremental
+
+
+@pytest.mark.order(19)
+def test_open_material_demand_removed_rows():
+	mr = frappe.copy_doc(
+		frappe.get_last_doc("Material Request", {"material_request_type": "Purchase", "docstatus": 1})
+	)
+	mr.save()
+	ledger = frappe.get_all(
+		"Open Material Demand",
+		{"material_request": mr.name},
+		["material_request_item", "supplier"],
+	)
+	assert {row.material_request_item for row in ledger} == {row.name for row in mr.items}
+
+	po = frappe.new_doc("Purchase Order")
+	po.company = mr.company
+	po.supplier = ledger[0].supplier
+	po.schedule_date = mr.schedule_date
+	for row in mr.items[:2]:
+		po.append(
+			"items",
+			{
+				"item_code": row.item_code,
+				"qty": row.qty,
+				"uom": row.uom,
+				"schedule_date": row.schedule_date,
+				"warehouse": row.warehouse,
+				"material_request": mr.name,
+				"material_request_item": row.name,
+			},
+		)
+	po.save()
+	removed_po_row = po.items[-1]
+	assert frappe.get_all(
+		"Open Material Demand",
+		{"material_request_item": removed_po_row.material_request_item},
+		pluck="draft_po_qty",
+	)[0] == removed_po_row.qty
+
+	po.remove(removed_po_row)
+	po.save()
+	assert set(
+		frappe.get_all(
+			"Open Material Demand",
+			{"material_request_item": removed_po_row.material_request_item},
+			pluck="draft_po_qty",
+		)
+	) == {0}
+
+	removed_mr_row = mr.items[-1]
+	mr.remove(removed_mr_row)
+	mr.save()
+	assert not frappe.db.exists(
+		"Open Material Demand", {"material_request_item": removed_mr_row.name}
+	)
+
+	po.delete()
+	mr.delete()
+	assert not frappe.db.exists("Open Material Demand", {"material_request": mr.name})
+
+
+@pytest.mark.order(7)
+def test_enqueue_create_summary(monkeypatch):
+	filters = frappe._dict(
+		{"end_date": getdate(), "price_list": "Bakery Buying", "company": "Ambrosia Pie Company"}
+	)
+	columns, rows = execute_material_demand(filters)
+	selected_rows = [row for row in rows if row.get("supplier") == "Freedom Provisions"]
+
+	queued = []
+	monkeypatch.setattr(frappe, "enqueue", lambda method, **kwargs: queued.append((method, kwargs)))
+	enqueue_create(
+		"Ambrosia Pie Company",
+		"Dispatch Notification",
+		frappe.as_json(filters),
+		"rfq",
+		frappe.as_json(selected_rows),
+	)
+	assert len(queued) == 1
+	method, kwargs = queued[0]
+	assert method == "inventory_tools.inventory_tools.report.material_demand.material_demand.create"
+	assert kwargs.pop("queue") == "long"
+	kwargs.pop("timeout")
+	kwargs.pop("job_name")
+
+	summary = create(**kwargs)
+	assert summary["status"] == "Completed"
+	rfqs = frappe.get_all("Request for Quotation", pluck="name")
+	assert sorted(d["name"] for d in summary["documents"]) == sorted(rfqs)
+	# progress is counted in selected item rows, the same unit as the report page's total
+	assert sum(d["rows"] for d in summary["documents"]) == len(
+		[row for row in selected_rows if row.get("item_code")]
+	)
+	for rfq in rfqs:
+		frappe.delete_doc("Request for Quotation", rfq)
+
+
+@pytest.mark.order(8)
+def test_report_lazy_supplier_rows():
+	filters = frappe._dict(
+		{"end_date": getdate(), "price_list": "Bakery Buying", "company": "Ambrosia Pie Company"}
+	)
+	columns, rows = execute_material_demand(filters)
+	suppliers = [row.get("supplier") for row in rows if row.get("indent") == 0]
+
+	filters.lazy = 1
+	columns, summary_rows = execute_material_demand(filters)
+	assert [row.get("supplier") for row in summary_rows] == suppliers
+	assert all(row.get("indent") == 0 for row in summary_rows)
+
+	for summary_row in summary_rows:
+		child_rows = get_supplier_rows(frappe.as_json(filters), summary_row.get("supplier"))
+		assert len(child_rows) == summary_row.get("row_count")
+		assert child_rows == [
+			row
+			for row in rows
+			if row.get("indent") == 1 and row.get("supplier") == summary_row.get("supplier")
+		]
+
+
+@pytest.mark.order(9)
+def test_report_export_rows():
+	filters = frappe._dict(
+		{"end_date": getdate(), "price_list": "Bakery Buying", "company": "Ambrosia Pie Company"}
+	)
+	columns, rows = execute_material_demand(filters)
+	rows = [row for row in rows if row.get("indent") == 1]
+
+	def key(row):
+		return (row.get("material_request"), row.get("item_code"), row.get("supplier"))
+
+	export_rows = list(get_export_rows(filters, chunk_size=5))
+	names = [row.name for row in export_rows]
+	assert names == sorted(set(names))  # keyset pages neither skip nor repeat rows
+	assert sorted(map(key, export_rows)) == sorted(map(key, rows))
+	total_demand = {row.get("item_code"): row.get("total_demand") for row in rows}
+	for export_row in export_rows:
+		assert export_row.get("total_demand") == total_demand[export_row.item_code]
+		assert "<span" not in str(export_row.get("draft_po"))
+		assert not isinstance(export_row.get("supplier_price"), str)
+
+	file_url = export(frappe.as_json(filters))
+	file = frappe.get_doc("File", {"file_url": file_url})
+	assert file.is_private
+	with open(file.get_full_path()) as f:
+		assert len(f.readlines()) == len(rows) + 1  # header row
+	file.delete()
 
 
 @pytest.mark.order(20)
@@ -2,6 +2,11 @@ import frappe
 import pytest
 from frappe.utils import flt, getdate
 
+from inventory_tools.inventory_tools.report.quotation_demand import quotation_demand
+from inventory_tools.inventory_tools.report.quotation_demand.quotation_demand import (
+	CUSTOMERS_PER_PAGE,
+	create,
+)
 from inventory_tools.inventory_tools.report.quotation_demand.quotation_demand import (
 	execute as execute_quotation_demand,
 )
@@ -126,3 +131,121 @@ def test_report_with_aggregation_and_aggregation_warehouse():
 	for item in so.items:
 		assert item.warehouse == "Stores - CFC"
 	frappe.delete_doc("Sales Order", so.name)
+
+
+@pytest.mark.order(53)
+def test_report_draft_sales_order_qty():
+	filters = frappe._dict({"end_date": getdate()})
+	columns, rows = execute_quotation_demand(filters)
+	assert not any(row.get("draft_so") for row in rows)
+
+	selected_rows = [
+		row for row in rows if row.get("customer") == "Almacs Food Group" and row.get("company")
+	]
+	frappe.call(
+		"inventory_tools.inventory_tools.report.quotation_demand.quotation_demand.create",
+		**{
+			"company": "Chelsea Fruit Co",
+			"filters": filters,
+			"rows": frappe.as_json(selected_rows),
+		},
+	)
+
+	columns, rows = execute_quotation_demand(filters)
+	for row in rows:
+		if not row.get("quotation_item"):
+			continue
+		draft_so_qty = sum(
+			frappe.get_all(
+				"Sales Order Item",
+				{"quotation_item": row.get("quotation_item"), "docstatus": 0},
+				pluck="qty",
+			)
+		)
+		if draft_so_qty:
+			assert row.get("draft_so") == f'<span style="color: red">{draft_so_qty}</span>'
+		else:
+			assert row.get("draft_so") is None
+
+	for so in frappe.get_all("Sales Order", {"docstatus": 0}, pluck="name"):
+		frappe.delete_doc("Sales Order", so)
+
+
+@pytest.mark.order(54)
+def test_create_retry_skips_completed_customers():
+	filters = frappe._dict({"end_date": getdate()})
+	columns, rows = execute_quotation_demand(filters)
+	selected_rows = [
+		row for row in rows if row.get("customer") == "Almacs Food Group" and row.get("company")
+	]
+
+	run_id = frappe.generate_hash(length=10)
+	summary = create("Chelsea Fruit Co", filters, frappe.as_json(selected_rows), run_id=run_id)
+	assert summary["status"] == "Completed"
+	assert len(summary["sales_orders"]) == 1
+
+	retry = create("Chelsea Fruit Co", filters, frappe.as_json(selected_rows), run_id=run_id)
+	assert retry["sales_orders"] == []
+	assert frappe.get_all("Sales Order", {"docstatus": 0}, pluck="name") == summary["sales_orders"]
+
+	for so in summary["sales_orders"]:
+		frappe.delete_doc("Sales Order", so)
+
+	# a customer's rows that aren't next to each other still make a single Sales Order
+	other_rows = [
+		row
+		for row in rows
+		if row.get("customer") not in (None, "Almacs Food Group")
+		and row.get("company") in {r.get("company") for r in selected_rows}
+	]
+	other_customer = other_rows[0].get("customer")
+	other_rows = [row for row in other_rows if row.get("customer") == other_customer]
+	interleaved_rows = selected_rows[:1] + other_rows + selected_rows[1:]
+	summary = create("Chelsea Fruit Co", filters, frappe.as_json(interleaved_rows))
+	assert len(summary["sales_orders"]) == 2
+	for so in summary["sales_orders"]:
+		so = frappe.get_doc("Sales Order", so)
+		customer_rows = selected_rows if so.customer == "Almacs Food Group" else other_rows
+		assert len(so.items) == len([row for row in customer_rows if row.get("item_code")])
+		so.delete()
+
+
+@pytest.mark.order(55)
+def test_report_filters_and_paging(monkeypatch):
+	filters = frappe._dict({"end_date": getdate()})
+	columns, rows = execute_quotation_demand(filters)
+	customers = [row.get("customer") for row in rows if not row.get("indent")]
+
+	filters.customer = "Almacs Food Group"
+	columns, customer_rows = execute_quotation_demand(filters)
+	assert [row.get("customer") for row in customer_rows if not row.get("indent")] == [
+		"Almacs Food Group"
+	]
+	assert all(row.get("customer") == "Almacs Food Group" for row in customer_rows)
+
+	item_code = customer_rows[1].get("item_code")
+	filters = frappe._dict({"end_date": getdate(), "item_code": item_code})
+	columns, item_rows = execute_quotation_demand(filters)
+	assert all(row.get("item_code") == item_code for row in item_rows if row.get("indent"))
+
+	# a parent Item Group matches the items of its child groups
+	item_group = frappe.get_value("Item", item_code, "item_group")
+	parent_item_group = frappe.get_value("Item Group", item_group, "parent_item_group")
+	filters = frappe._dict({"end_date": getdate(), "item_group": parent_item_group})
+	columns, group_rows = execute_quotation_demand(filters)
+	assert item_code in [row.get("item_code") for row in group_rows if row.get("indent")]
+
+	filters = frappe._dict({"end_date": getdate(), "page": 2})
+	columns, next_page = execute_quotation_demand(filters)
+	assert len(customers) <= CUSTOMERS_PER_PAGE
+	assert next_page == []
+
+	# with one customer per page, the pages don't overlap and together cover every customer
+	monkeypatch.setattr(quotation_demand, "CUSTOMERS_PER_PAGE", 1)
+	paged_customers = []
+	for page in range(1, len(customers) + 2):
+		columns, page_rows = execute_quotation_demand(frappe._dict({"end_date": getdate(), "page": page}))
+		page_customers = [row.get("customer") for row in page_rows if not row.get("indent")]
+		assert len(page_customers) == (1 if page <= len(customers) else 0)
+		paged_customers += page_customers
+	assert paged_customers == customers
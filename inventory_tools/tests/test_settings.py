@@ -0,0 +1,29 @@
+import frappe
+import pytest
+
+from inventory_tools.inventory_tools.settings import (
+	SETTINGS_CACHE_KEY,
+	get_inventory_tools_settings,
+)
+
+
+@pytest.mark.order(2)
+def test_cached_settings_invalidated_on_update():
+	company = frappe.defaults.get_defaults().get("company")
+	settings = get_inventory_tools_settings(company)
+	assert settings.company == company
+	assert frappe.cache().hget(SETTINGS_CACHE_KEY, company) is not None
+	assert get_inventory_tools_settings(company) is settings  # served from frappe.local
+
+	inventory_tools_settings = frappe.get_doc("Inventory Tools Settings", company)
+	inventory_tools_settings.enforce_uoms = not settings.enforce_uoms
+	inventory_tools_settings.save()
+	assert frappe.cache().hget(SETTINGS_CACHE_KEY, company) is None
+	assert get_inventory_tools_settings(company).enforce_uoms == (not settings.enforce_uoms)
+
+	inventory_tools_settings.enforce_uoms = settings.enforce_uoms
+	inventory_tools_settings.save()
+	assert get_inventory_tools_settings(company).enforce_uoms == settings.enforce_uoms
+	assert get_inventory_tools_settings("Not A Company") is None
+	with pytest.raises(frappe.DoesNotExistError):
+		get_inventory_tools_settings("Not A Company", throw=True)
@@ -1,6 +1,8 @@
 import frappe
 import pytest
 
+from inventory_tools.inventory_tools.overrides import warehouse
+
 
 @pytest.mark.order(1)
 def test_warehouse_path():
@@ -15,3 +17,19 @@ def test_warehouse_path():
 	wh.parent_warehouse = "Baked Goods - APC"
 	wh.save()
 	assert wh.warehouse_path == "Finished Goods ⇒ Bakery Display"
+
+
+@pytest.mark.order(3)
+def test_warehouse_query(monkeypatch):
+	args = ("Warehouse", "Bakery", "name", 0, 20, {})
+	results = warehouse.warehouse_query(*args)
+	assert "Bakery Display - APC" in [row[0] for row in results]
+	assert "Finished Goods \u21D2 Bakery Display" in [value for row in results for value in row]
+
+	# the path search runs whether or not warehouse paths are enabled
+	monkeypatch.setattr(
+		warehouse,
+		"get_inventory_tools_settings",
+		lambda company: frappe._dict({"update_warehouse_path": 0}),
+	)
+	assert warehouse.warehouse_query(*args) == results